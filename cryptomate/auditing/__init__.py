@@ -0,0 +1,7 @@
+from cryptomate.auditing.journal import EventType, Journal
+from cryptomate.auditing.reader import Record, read_journal
+
+__all__ = (
+    'EventType', 'Journal',
+    'Record', 'read_journal',
+)
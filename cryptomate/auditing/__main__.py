@@ -0,0 +1,4 @@
+import sys
+from cryptomate.auditing.reader import main
+
+sys.exit(main())
@@ -0,0 +1,197 @@
+import asyncio
+import mmap
+import os
+import struct
+import time
+from enum import IntEnum
+
+MAGIC = b'CMAUDIT1'
+
+#: File header: magic, version, slot size, slot count, writer pid, next sequence number.
+HEADER = struct.Struct('<8sHHII4xQ')
+HEADER_SIZE = 64
+NEXT_SEQ_OFFSET = 24
+
+#: Record header: sequence number, timestamp, event type, flags, payload length.
+RECORD = struct.Struct('<QdBBH')
+FLAG_TRUNCATED = 0x01
+
+_NEXT_SEQ = struct.Struct('<Q')
+
+
+class EventType(IntEnum):
+    ''' Kind of audited event. Values are stored in journal files and must never change. '''
+    ORDER_SENT = 1          #: an order was sent to an exchange
+    ORDER_ACK = 2           #: an exchange acknowledged or rejected an order
+    TRADE = 3               #: an order generated a trade
+    FEED_RECONNECT = 4      #: a market feed lost its connection and reconnected
+    SUBSCRIPTION = 5        #: a market event stream was enabled or disabled
+
+
+#: Field names of each event type, in the order they are recorded.
+FIELDS = {
+    EventType.ORDER_SENT: ('symbol', 'side', 'type', 'amount', 'price', 'leverage'),
+    EventType.ORDER_ACK: ('symbol', 'order_id', 'status'),
+    EventType.TRADE: ('id', 'timestamp', 'symbol', 'side', 'amount', 'price', 'fee'),
+    EventType.FEED_RECONNECT: ('feed', 'symbol', 'reason'),
+    EventType.SUBSCRIPTION: ('feed', 'symbol', 'event', 'action'),
+}
+
+
+class Journal:
+    ''' Per-process audit journal, backed by a memory-mapped ring file.
+
+    Each event is stored as a compact binary record in a fixed-size slot, overwriting the
+    oldest record once the ring is full. Recording an event only packs a few bytes into
+    the mapping; the operating system writes pages back to disk on its own, and
+    :meth:`start` schedules periodic explicit flushes that run in the default executor.
+
+    Field values are recorded as their string representation, `None` being recorded as
+    an empty string. Records that do not fit in a slot are truncated and flagged as such.
+
+    Existing files are never overwritten, so that an earlier audit trail cannot be lost
+    to a process reusing its pid: :class:`FileExistsError` is raised instead.
+
+    :param str path: path of ring file. Defaults to ``audit-<time>-<pid>.ring`` in
+                     ``directory``, with the UTC creation time as ``YYYYmmddTHHMMSS``.
+    :param str directory: where to create the ring file if ``path`` is not given.
+    :param int slots: number of records the ring holds.
+    :param int slot_size: size of a single record in bytes, header included.
+    '''
+    __slots__ = ('path', '_fd', '_mmap', '_slots', '_slot_size', '_payload_size', '_seq',
+                 '_flusher')
+
+    def __init__(self, path=None, *, directory='.', slots=65536, slot_size=128):
+        if slot_size <= RECORD.size or slot_size > 0xffff:
+            raise ValueError('slot_size must be between %d and 65535' % (RECORD.size + 1))
+        if slots < 1:
+            raise ValueError('slots must be positive')
+        self.path = path or os.path.join(directory, 'audit-%s-%d.ring' % (
+            time.strftime('%Y%m%dT%H%M%S', time.gmtime()), os.getpid()))
+        self._slots = slots
+        self._slot_size = slot_size
+        self._payload_size = slot_size - RECORD.size
+        self._seq = 0
+        self._flusher = None
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            os.ftruncate(self._fd, HEADER_SIZE + slots * slot_size)
+            self._mmap = mmap.mmap(self._fd, HEADER_SIZE + slots * slot_size)
+        except Exception:
+            os.close(self._fd)
+            raise
+        HEADER.pack_into(self._mmap, 0, MAGIC, 1, slot_size, slots, os.getpid(), 0)
+
+    def record(self, event, *values):
+        ''' Append a record to the journal.
+
+        :param EventType event: type of event to record.
+        :param values: event fields, as listed in :data:`FIELDS`.
+        '''
+        seq = self._seq
+        payload = '\0'.join('' if value is None else str(value) for value in values).encode()
+        flags = 0
+        if len(payload) > self._payload_size:
+            payload = payload[:self._payload_size]
+            flags = FLAG_TRUNCATED
+
+        mm = self._mmap
+        offset = HEADER_SIZE + (seq % self._slots) * self._slot_size
+        start = offset + RECORD.size
+        mm[start:start + len(payload)] = payload
+        RECORD.pack_into(mm, offset, seq, time.time(), event, flags, len(payload))
+        self._seq = seq + 1
+        _NEXT_SEQ.pack_into(mm, NEXT_SEQ_OFFSET, seq + 1)
+
+    # Typed helpers
+
+    def order_sent(self, symbol, order):
+        ''' Record an order being sent.
+
+        :param str symbol: Market symbol. Actual meaning depends on platform.
+        :param ~cryptomate.trading.account.Order order: order being sent.
+        '''
+        self.record(EventType.ORDER_SENT, symbol, order.side, order.type,
+                    order.amount, order.price, order.leverage)
+
+    def order_ack(self, symbol, order_id, status):
+        ''' Record an exchange acknowledging an order.
+
+        :param str symbol: Market symbol. Actual meaning depends on platform.
+        :param order_id: identifier the exchange assigned to the order.
+        :param str status: acknowledgement status, such as ``accepted`` or ``rejected``.
+        '''
+        self.record(EventType.ORDER_ACK, symbol, order_id, status)
+
+    def trade(self, trade):
+        ''' Record a trade.
+
+        :param ~cryptomate.trading.data.Trade trade: trade to record.
+        '''
+        self.record(EventType.TRADE, trade.id, trade.timestamp, trade.symbol, trade.side,
+                    trade.amount, trade.price, trade.fee)
+
+    def feed_reconnect(self, feed, symbol, reason=None):
+        ''' Record a market feed reconnection.
+
+        :param str feed: feed name.
+        :param str symbol: Market symbol, or `None` if the whole feed reconnected.
+        :param str reason: description of the error that caused the reconnection.
+        '''
+        self.record(EventType.FEED_RECONNECT, feed, symbol, reason)
+
+    def subscription_change(self, feed, symbol, event, enabled):
+        ''' Record a market event stream being enabled or disabled.
+
+        :param str feed: feed name.
+        :param str symbol: Market symbol. Actual meaning depends on platform.
+        :param ~cryptomate.market.feed.base.FeedEvent event: event stream.
+        :param bool enabled: whether the stream was enabled or disabled.
+        '''
+        self.record(EventType.SUBSCRIPTION, feed, symbol, event.name.lower(),
+                    'enable' if enabled else 'disable')
+
+    # Lifecycle
+
+    def start(self, interval=1):
+        ''' Start flushing the journal to disk periodically.
+
+        :param float interval: delay in seconds between two flushes.
+        '''
+        if self._flusher is None:
+            self._flusher = asyncio.ensure_future(self._flush_periodically(interval))
+
+    async def flush(self):
+        ''' Ensure all records written so far have been sent to storage. '''
+        await asyncio.get_event_loop().run_in_executor(None, self._mmap.flush)
+
+    def close(self):
+        ''' Stop periodic flushes. No records may be appended afterwards. '''
+        if self._flusher is not None:
+            self._flusher.cancel()
+
+    async def wait_closed(self):
+        ''' Flush remaining records and release the ring file.
+            Only valid after :meth:`close` has been called.
+        '''
+        if self._flusher is not None:
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._mmap is not None:
+            await self.flush()
+            self._mmap.close()
+            os.close(self._fd)
+            self._mmap = None
+
+    async def _flush_periodically(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def __repr__(self):
+        return '%s(%r, slots=%d, slot_size=%d)' % (self.__class__.__name__, self.path,
+                                                   self._slots, self._slot_size)
@@ -0,0 +1,102 @@
+import argparse
+import sys
+import time
+from collections import namedtuple
+from cryptomate.auditing.journal import (EventType, FIELDS, FLAG_TRUNCATED, HEADER, HEADER_SIZE,
+                                         MAGIC, RECORD)
+
+Record = namedtuple('Record', 'seq timestamp type fields truncated', module=__name__)
+Record.__doc__ = ''' A single decoded journal record.
+
+:param int seq: Sequence number of record within its journal.
+:param float timestamp: Number of seconds between the Epoch and the time the event was recorded.
+:param EventType type: Type of event.
+:param dict fields: Event fields, as strings, mapped by name. Missing values are `None`.
+:param bool truncated: Whether the record was too large and some data was lost.
+'''
+
+
+def read_journal(path, *, types=None, since=None, until=None, **filters):
+    ''' Decode records from a journal ring file, oldest first.
+
+    The file may still be written to: records overwritten while reading are skipped.
+
+    :param str path: path of ring file.
+    :param types: event types to return. All types if `None`.
+    :paramtype types: ~collections.abc.Container(EventType) or None
+    :param float since: only return records at or after this timestamp.
+    :param float until: only return records before this timestamp.
+    :param filters: only return records whose fields have the given values.
+    :rtype: ~collections.abc.Iterator(Record)
+    '''
+    with open(path, 'rb') as fd:
+        data = fd.read()
+    if len(data) < HEADER_SIZE:
+        raise ValueError('%s is not an audit journal' % path)
+    magic, version, slot_size, slots, _, next_seq = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != 1:
+        raise ValueError('%s is not an audit journal' % path)
+
+    for seq in range(max(0, next_seq - slots), next_seq):
+        offset = HEADER_SIZE + (seq % slots) * slot_size
+        record_seq, timestamp, event, flags, length = RECORD.unpack_from(data, offset)
+        if record_seq != seq:
+            continue
+        if types is not None and event not in types:
+            continue
+        if (since is not None and timestamp < since) or (until is not None and timestamp >= until):
+            continue
+
+        start = offset + RECORD.size
+        values = data[start:start + length].decode('utf-8', 'replace').split('\0')
+        event = EventType(event)
+        fields = {name: value or None
+                  for name, value in zip(FIELDS[event], values)}
+        if any(fields.get(name) != value for name, value in filters.items()):
+            continue
+        yield Record(seq, timestamp, event, fields, bool(flags & FLAG_TRUNCATED))
+
+
+def format_record(record):
+    ''' Render a record as a single line of text '''
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(record.timestamp))
+    fields = ' '.join('%s=%s' % item for item in record.fields.items() if item[1] is not None)
+    return '%s.%06d %8d %-14s %s%s' % (
+        stamp, int(record.timestamp % 1 * 1000000), record.seq, record.type.name.lower(),
+        fields, ' [truncated]' if record.truncated else '')
+
+
+def parse_arguments(args=None):
+    ''' Convert command-line arguments into usable options '''
+    parser = argparse.ArgumentParser(description='Decode cryptomate audit journals.')
+    parser.add_argument('paths', nargs='+', metavar='path', help='journal ring file')
+    parser.add_argument('-t', '--type', action='append', dest='types',
+                        choices=[event.name.lower() for event in EventType],
+                        help='only show events of this type (repeatable)')
+    parser.add_argument('--since', type=float, help='only show events at or after timestamp')
+    parser.add_argument('--until', type=float, help='only show events before timestamp')
+    parser.add_argument('-f', '--filter', action='append', default=[], metavar='FIELD=VALUE',
+                        help='only show events with given field value (repeatable)')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    ''' Entry point for ``python -m cryptomate.auditing`` '''
+    options = parse_arguments(args=args)
+    types = (frozenset(EventType[name.upper()] for name in options.types)
+             if options.types else None)
+    try:
+        filters = dict(item.split('=', 1) for item in options.filter)
+    except ValueError:
+        print('filters must have form FIELD=VALUE', file=sys.stderr)
+        return 2
+
+    for path in options.paths:
+        try:
+            for record in read_journal(path, types=types, since=options.since,
+                                       until=options.until, **filters):
+                print(format_record(record))
+        except (OSError, ValueError) as exc:
+            print('%s: %s' % (path, exc), file=sys.stderr)
+            return 1
+    return 0
@@ -0,0 +1,9 @@
+from cryptomate.benchmark.runner import (BENCHMARKS, Benchmark, Result, Skipped, register,
+                                         run, to_json)
+from cryptomate.benchmark.synthetic import MarketGenerator, SyntheticFeed
+import cryptomate.benchmark.suites
+
+__all__ = (
+    'BENCHMARKS', 'Benchmark', 'Result', 'Skipped', 'register', 'run', 'to_json',
+    'MarketGenerator', 'SyntheticFeed',
+)
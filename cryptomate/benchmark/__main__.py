@@ -0,0 +1,4 @@
+import sys
+from cryptomate.benchmark.runner import main
+
+sys.exit(main())
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import time
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayServer:
+    ''' Local stand-in for an exchange combined-stream websocket endpoint.
+
+    Every connection to ``/stream?streams=a/b/c`` gets the recorded messages of requested
+    streams replayed in order, at a configurable rate. The server can inject faults:
+    dropping connections after a number of messages or on demand, pausing all replays,
+    and disconnecting consumers that do not keep up, as exchanges do.
+
+    Point a feed at the server with its :attr:`url`, for instance::
+
+        server = ReplayServer(MarketGenerator().binance_messages(100000), rate=50000)
+        await server.start()
+        feed = BinanceFeed(callback=callback, on_error=on_error, ws_url=server.url)
+
+    :param messages: JSON-encoded combined stream messages, each with a ``stream`` field.
+    :paramtype messages: ~collections.abc.Iterable(str)
+    :param float rate: messages per second sent on each connection, `None` for no limit.
+    :param int batch: number of messages sent between two rate checks.
+    :param bool repeat: whether to start over once all messages have been sent.
+    :param int disconnect_after: number of messages after which connections are dropped,
+                                 `None` to never drop them.
+    :param int max_buffer: size in bytes of unsent data above which a consumer is deemed
+                           too slow and disconnected, `None` to wait for slow consumers.
+    :param bool continuous: whether connections resume after the last message sent to
+                            previous connections for the same streams, as a live stream
+                            would, instead of starting over.
+    :param int skip: number of messages skipped when resuming in continuous mode,
+                     emulating events published while the consumer was disconnected.
+    :param str host: address to listen on.
+    :param int port: port to listen on, `0` to pick a free port.
+    :ivar int connections: number of connections accepted so far.
+    :ivar int sent: number of messages sent so far, over all connections.
+    :ivar int slow_disconnects: number of connections dropped for being too slow.
+    '''
+
+    def __init__(self, messages, *, rate=None, batch=100, repeat=False, disconnect_after=None,
+                 max_buffer=None, continuous=False, skip=0, host='127.0.0.1', port=0):
+        self._messages = [(json.loads(message)['stream'], message) for message in messages]
+        self._max_frame = max((len(message.encode()) for _, message in self._messages),
+                              default=0) + 14       # largest websocket frame header
+        self.rate = rate
+        self.batch = batch
+        self.repeat = repeat
+        self.disconnect_after = disconnect_after
+        self.max_buffer = max_buffer
+        self.continuous = continuous
+        self.skip = skip
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.sent = 0
+        self.slow_disconnects = 0
+        self._sockets = set()
+        self._cursors = {}          # streams => number of messages sent, in continuous mode
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self._runner = None
+
+    @property
+    def url(self):
+        ''' Websocket URL template, with a ``{streams}`` placeholder. '''
+        return 'ws://%s:%d/stream?streams={streams}' % (self.host, self.port)
+
+    async def start(self):
+        ''' Start listening for connections '''
+        app = web.Application()
+        app.router.add_get('/stream', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logger.info('replay server listening on %s:%d', self.host, self.port)
+
+    async def close(self):
+        ''' Drop all connections and stop listening '''
+        await self.disconnect()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def disconnect(self):
+        ''' Drop all current connections '''
+        sockets, self._sockets = self._sockets, set()
+        for ws in sockets:
+            await ws.close()
+
+    def pause(self, duration=None):
+        ''' Stop sending messages on all connections.
+
+        :param float duration: number of seconds after which to resume automatically,
+                               `None` to wait for :meth:`resume`.
+        '''
+        self._resume.clear()
+        if duration is not None:
+            asyncio.get_event_loop().call_later(duration, self._resume.set)
+
+    def resume(self):
+        ''' Resume sending messages after :meth:`pause` '''
+        self._resume.set()
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self._sockets.add(ws)
+
+        streams = frozenset(request.query.get('streams', '').split('/'))
+        messages = [message for stream, message in self._messages if stream in streams]
+        if self.continuous:
+            if streams in self._cursors:
+                self._cursors[streams] += self.skip
+            else:
+                self._cursors[streams] = 0
+            start = self._cursors[streams]
+            if self.repeat and messages:
+                start %= len(messages)
+                messages = messages[start:] + messages[:start]
+            else:
+                messages = messages[start:]
+        try:
+            if await self._replay(ws, request.transport, messages, streams):
+                async for _ in ws:      # wait for consumer to close the connection
+                    pass
+        except ConnectionError:
+            pass
+        finally:
+            self._sockets.discard(ws)
+            await ws.close()
+        return ws
+
+    async def _replay(self, ws, transport, messages, streams):
+        ''' Send messages on a connection. Return whether the connection is still usable. '''
+        if not messages:
+            return True
+        monitored = self.max_buffer is not None and transport is not None
+        if monitored:
+            # Sends wait for the socket to drain once its buffer exceeds the high-water
+            # mark. Raise it past the largest frame that can be added to a buffer still
+            # under max_buffer, so that slow consumers are checked before every send
+            # instead of being waited for.
+            transport.set_write_buffer_limits(high=self.max_buffer + self._max_frame)
+        sent = 0
+        start = time.monotonic()
+        while True:
+            for idx in range(0, len(messages), self.batch):
+                if not self._resume.is_set():
+                    paused = time.monotonic()
+                    await self._resume.wait()
+                    start += time.monotonic() - paused
+                if ws.closed:
+                    return False
+
+                chunk = messages[idx:idx + self.batch]
+                if self.disconnect_after is not None:
+                    chunk = chunk[:self.disconnect_after - sent]
+                for message in chunk:
+                    if monitored and transport.get_write_buffer_size() > self.max_buffer:
+                        logger.info('disconnecting slow consumer after %d messages', sent)
+                        self.slow_disconnects += 1
+                        return False
+                    await ws.send_str(message)
+                    sent += 1
+                    self.sent += 1
+                    if self.continuous:
+                        self._cursors[streams] += 1
+
+                if self.disconnect_after is not None and sent >= self.disconnect_after:
+                    return False
+
+                if self.rate:
+                    delay = start + sent / self.rate - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    await asyncio.sleep(0)
+            if not self.repeat:
+                return True
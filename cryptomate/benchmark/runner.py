@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import json
+import platform
+import time
+from collections import namedtuple
+import cryptomate
+
+Benchmark = namedtuple('Benchmark', 'name setup params', module=__name__)
+Benchmark.__doc__ = ''' A registered benchmark.
+
+:param str name: Benchmark name, dotted by area.
+:param callable setup: Prepares a single run. Has form ``setup(scale, **params)`` and
+                       returns a ``(run, operations, size)`` tuple, ``run`` being a function
+                       or coroutine function that performs ``operations`` operations over
+                       ``size`` bytes of data. A fourth item may be given, a function
+                       releasing resources once all runs are over.
+:param params: Sets of parameters to run the benchmark with.
+:type params: ~collections.abc.Sequence(dict)
+'''
+
+Result = namedtuple('Result', 'name params operations size best mean skipped', module=__name__)
+Result.__doc__ = ''' Outcome of a benchmark with a given set of parameters.
+
+:param str name: Benchmark name.
+:param dict params: Parameters the benchmark was run with.
+:param int operations: Number of operations performed by each run.
+:param int size: Number of bytes processed by each run, 0 if not applicable.
+:param float best: Duration of fastest run in seconds.
+:param float mean: Average duration of runs in seconds.
+:param skipped: Reason the benchmark could not run, `None` if it did.
+:type skipped: str or None
+'''
+
+BENCHMARKS = []
+
+
+class Skipped(Exception):
+    ''' Raised by benchmark setup when the benchmark cannot run '''
+
+
+def register(name, *, params=({},)):
+    ''' Decorator registering a benchmark setup function.
+
+    :param str name: benchmark name.
+    :param params: sets of parameters to run the benchmark with.
+    '''
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(name, setup, tuple(params)))
+        return setup
+    return decorator
+
+
+def run(names=None, *, repeat=5, scale=1.0):
+    ''' Run registered benchmarks.
+
+    :param names: only run benchmarks whose name starts with one of those.
+    :paramtype names: ~collections.abc.Iterable(str) or None
+    :param int repeat: number of times each benchmark is run.
+    :param float scale: multiplier of the amount of work in each run.
+    :rtype: list(Result)
+    '''
+    names = tuple(names or ())
+    loop = asyncio.new_event_loop()
+    results = []
+    try:
+        for benchmark in BENCHMARKS:
+            if names and not benchmark.name.startswith(names):
+                continue
+            for params in benchmark.params:
+                results.append(_run_one(loop, benchmark, params, repeat, scale))
+    finally:
+        loop.close()
+    return results
+
+
+def _run_one(loop, benchmark, params, repeat, scale):
+    try:
+        func, operations, size, *teardown = benchmark.setup(scale, **params)
+    except Skipped as exc:
+        return Result(benchmark.name, params, 0, 0, None, None, str(exc))
+
+    durations = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outcome = func()
+            if asyncio.iscoroutine(outcome):
+                loop.run_until_complete(outcome)
+            durations.append(time.perf_counter() - start)
+    finally:
+        for release in teardown:
+            release()
+    return Result(benchmark.name, params, operations, size,
+                  min(durations), sum(durations) / len(durations), None)
+
+
+def to_json(results):
+    ''' Convert results into a JSON-serializable document, tagged with environment details. '''
+    return {
+        'version': '%d.%d.%d' % cryptomate.__VERSION__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'timestamp': int(time.time()),
+        'results': [dict(result._asdict(),
+                         rate=result.operations / result.best if result.best else None,
+                         throughput=(result.size / result.best / 1000000
+                                     if result.size and result.best else None))
+                    for result in results],
+    }
+
+
+def format_results(results):
+    ''' Render results as a text table '''
+    lines = ['%-32s %-16s %14s %10s %12s' % ('benchmark', 'params', 'ops/s', 'MB/s', 'best (ms)')]
+    for result in results:
+        params = ','.join('%s=%s' % item for item in sorted(result.params.items())) or '-'
+        if result.skipped:
+            lines.append('%-32s %-16s skipped: %s' % (result.name, params, result.skipped))
+            continue
+        throughput = ('%10.1f' % (result.size / result.best / 1000000) if result.size
+                      else '%10s' % '-')
+        lines.append('%-32s %-16s %14.0f %s %12.3f' % (
+            result.name, params, result.operations / result.best, throughput, result.best * 1000))
+    return '\n'.join(lines)
+
+
+def parse_arguments(args=None):
+    ''' Convert command-line arguments into usable options '''
+    parser = argparse.ArgumentParser(description='Run cryptomate performance benchmarks.')
+    add_arguments(parser)
+    return parser.parse_args(args)
+
+
+def add_arguments(parser):
+    ''' Declare benchmark options on an argument parser '''
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help='only run benchmarks whose name starts with this')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='runs per benchmark')
+    parser.add_argument('-s', '--scale', type=float, default=1.0,
+                        help='multiplier of the amount of work per run')
+    parser.add_argument('-o', '--output', help='write JSON results to this file')
+    parser.add_argument('-l', '--list', action='store_true', help='list benchmarks and exit')
+
+
+def execute(options):
+    ''' Run benchmarks as described by parsed options '''
+    if options.list:
+        for benchmark in BENCHMARKS:
+            print(benchmark.name)
+        return 0
+
+    results = run(options.names, repeat=options.repeat, scale=options.scale)
+    print(format_results(results))
+    if options.output:
+        with open(options.output, 'w') as fd:
+            json.dump(to_json(results), fd, indent=2, default=str)
+    return 0
+
+
+def main(args=None):
+    ''' Entry point for ``python -m cryptomate.benchmark`` '''
+    return execute(parse_arguments(args=args))
@@ -0,0 +1,202 @@
+''' Benchmarks of market data handling '''
+import asyncio
+import json
+import tempfile
+from decimal import Decimal
+from cryptomate.benchmark.runner import Skipped, register
+from cryptomate.benchmark.synthetic import MarketGenerator, SyntheticFeed
+from cryptomate.history import FileHistory
+from cryptomate.instrumentation import clock
+from cryptomate.market import Engine, FeedDescription
+from cryptomate.market.aggregator import Aggregator
+from cryptomate.market.consolidated import ConsolidatedBook
+from cryptomate.market.feed import FeedEvent, Factory
+from cryptomate.market.orderbook import OrderBook
+
+
+def _no_op(*args, **kwargs):
+    pass
+
+
+@register('feed.binance.process')
+def binance_process(scale):
+    ''' Decoding of Binance combined stream trade messages into ticks '''
+    try:
+        from cryptomate.market.feed.binance import BinanceFeed
+    except ImportError as exc:
+        raise Skipped('binance feed unavailable: %s' % exc)
+
+    messages = MarketGenerator().binance_messages(int(100000 * scale))
+    feed = BinanceFeed(callback=_no_op, on_error=_no_op)
+    feed._streams['btcusdt@trade'] = 'btcusdt'
+
+    def run():
+        feed._last.clear()      # or ticks of previous runs make these duplicates
+        process, loads = feed._process, json.loads
+        for message in messages:
+            process(loads(message), clock())
+    return run, len(messages), sum(len(message) for message in messages)
+
+
+@register('feed.binance.replay', params=({'rate': None}, {'rate': 20000}))
+def binance_replay(scale, rate):
+    ''' End-to-end reception of messages from a local replay server '''
+    try:
+        from cryptomate.benchmark.replay import ReplayServer
+        from cryptomate.market.feed.binance import BinanceFeed
+    except ImportError as exc:
+        raise Skipped('binance feed unavailable: %s' % exc)
+
+    messages = MarketGenerator().binance_messages(int(100000 * scale))
+
+    async def run():
+        server = ReplayServer(messages, rate=rate)
+        await server.start()
+        done = asyncio.Event()
+        received = 0
+
+        def callback(feed, symbol, event, data):
+            nonlocal received
+            received += 1
+            if received == len(messages):
+                done.set()
+
+        feed = BinanceFeed(callback=callback, on_error=_no_op, ws_url=server.url)
+        try:
+            await feed.enable('btcusdt', FeedEvent.TICK)
+            await done.wait()
+        finally:
+            feed.close()
+            await feed.wait_closed()
+            await server.close()
+    return run, len(messages), sum(len(message) for message in messages)
+
+
+@register('market.aggregator.update', params=({'period': 1}, {'period': 60}))
+def aggregator_update(scale, period):
+    ''' Aggregation of ticks into candles '''
+    ticks = MarketGenerator().ticks(int(100000 * scale))
+
+    def run():
+        Aggregator(period).update(ticks)
+    return run, len(ticks), 0
+
+
+@register('market.orderbook.update', params=({'depth': 10}, {'depth': 100}, {'depth': 1000}))
+def orderbook_update(scale, depth, batch=100):
+    ''' Application of order update batches to a book of given depth '''
+    generator = MarketGenerator()
+    book = OrderBook()
+    book.update(generator.snapshot(depth))
+    updates = generator.order_updates(int(100000 * scale), depth=depth)
+    batches = [updates[idx:idx + batch] for idx in range(0, len(updates), batch)]
+
+    def run():
+        for item in batches:
+            book.update(item)
+    return run, len(updates), 0
+
+
+@register('market.engine.dispatch', params=({'queue_size': None}, {'queue_size': 1000}))
+def engine_dispatch(scale, queue_size, subscribers=4):
+    ''' Delivery of ticks to subscribers, inline or through their queues '''
+    ticks = MarketGenerator().ticks(int(100000 * scale))
+    description = FeedDescription('synthetic', 'btcusdt', None)
+    key = (description.name, description.symbol, FeedEvent.TICK)
+
+    async def run():
+        engine = Engine(factory=Factory(classes={'synthetic': SyntheticFeed}))
+        subscriptions = [await engine.subscribe_ticks(description, _no_op, queue_size=queue_size)
+                         for _ in range(subscribers)]
+        for tick in ticks:
+            engine._dispatch_ticks(key, (tick,))
+            await asyncio.sleep(0)
+        while any(subscription.lag for subscription in subscriptions):
+            await asyncio.sleep(0)
+        engine.close()
+        await engine.wait_closed()
+    return run, len(ticks) * subscribers, 0
+
+
+@register('market.consolidated.refresh', params=({'venues': 2}, {'venues': 8}))
+def consolidated_refresh(scale, venues, depth=100, batch=100):
+    ''' Merging of order update batches from several platforms into a consolidated book '''
+    consolidated = ConsolidatedBook('btcusdt')
+    batches = []
+    for idx in range(venues):
+        name = 'venue%d' % idx
+        generator = MarketGenerator(seed=name)
+        book = OrderBook()
+        book.update(generator.snapshot(depth))
+        consolidated.add_venue(name, book, fee=Decimal(idx) / 1000)
+        updates = generator.order_updates(int(100000 * scale) // venues, depth=depth)
+        batches.extend((name, book, updates[start:start + batch])
+                       for start in range(0, len(updates), batch))
+
+    def run():
+        for name, book, item in batches:
+            book.update(item)
+            consolidated.refresh(name, item)
+    return run, sum(len(item) for _, _, item in batches), 0
+
+
+@register('market.consolidated.route', params=({'amount': 1}, {'amount': 50}))
+def consolidated_route(scale, amount, venues=8, depth=100):
+    ''' Best price lookups for a given volume across platforms '''
+    consolidated = ConsolidatedBook('btcusdt')
+    for idx in range(venues):
+        book = OrderBook()
+        book.update(MarketGenerator(seed=idx).snapshot(depth))
+        consolidated.add_venue('venue%d' % idx, book, fee=Decimal(idx) / 1000)
+    count = int(10000 * scale)
+    amount = Decimal(amount)
+
+    def run():
+        route = consolidated.route
+        for _ in range(count):
+            route('buy', amount)
+    return run, count, 0
+
+
+@register('history.write')
+def history_write(scale):
+    ''' Writing ticks through file history '''
+    ticks = MarketGenerator().ticks(int(100000 * scale))
+    directory = tempfile.TemporaryDirectory()
+    history = FileHistory(directory.name)
+    description = FeedDescription('synthetic', 'btcusdt', None)
+
+    async def run():
+        writer = await history.get_writer(description)
+        writer.write_ticks(ticks)
+        await writer.flush()
+    return run, len(ticks), _tick_size(ticks), directory.cleanup
+
+
+@register('history.read')
+def history_read(scale):
+    ''' Reading ticks through file history '''
+    ticks = MarketGenerator().ticks(int(100000 * scale))
+    directory = tempfile.TemporaryDirectory()
+    history = FileHistory(directory.name)
+    description = FeedDescription('synthetic', 'btcusdt', None)
+
+    async def prepare():
+        writer = await history.get_writer(description)
+        writer.write_ticks(ticks)
+        await writer.flush()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(prepare())
+    finally:
+        loop.close()
+
+    async def run():
+        reader = await history.get_reader(description)
+        await reader.read_ticks(0, 2 ** 63)
+    return run, len(ticks), _tick_size(ticks), directory.cleanup
+
+
+def _tick_size(ticks):
+    ''' Size of ticks as stored in history files '''
+    return sum(len('%d,%d,%s,%s,%s\n' % tick) for tick in ticks)
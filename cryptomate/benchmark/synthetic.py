@@ -0,0 +1,202 @@
+import asyncio
+import json
+import random
+from decimal import Decimal
+from cryptomate.market.data import OrderUpdate, Tick
+from cryptomate.market.feed import Feed, FeedEvent, register
+
+
+class MarketGenerator:
+    ''' Deterministic generator of realistic market event streams.
+
+    Prices follow a random walk on a grid of ``tick_size``, trade amounts have a
+    heavy-tailed distribution and order updates concentrate near the current price.
+
+    :param int seed: random seed. Equal seeds generate equal streams.
+    :param ~decimal.Decimal price: initial price.
+    :param ~decimal.Decimal tick_size: price granularity.
+    :param float volatility: standard deviation of relative price change between two ticks.
+    :param int timestamp: number of seconds between the Epoch and the first event.
+    :param float rate: average number of events per second, used to advance timestamps.
+    '''
+    __slots__ = ('_random', '_tick_size', '_price', '_volatility', '_time', '_rate', '_id')
+
+    def __init__(self, *, seed=0, price=Decimal('4000'), tick_size=Decimal('0.01'),
+                 volatility=0.00001, timestamp=1546300800, rate=10):
+        self._random = random.Random(seed)
+        self._tick_size = tick_size
+        self._price = int(price / tick_size)    # in ticks
+        self._volatility = volatility
+        self._time = float(timestamp)
+        self._rate = rate
+        self._id = 0
+
+    def _step(self, move=True):
+        rnd = self._random
+        self._time += rnd.expovariate(self._rate)
+        if move:
+            self._price = max(1, self._price + int(round(rnd.gauss(0, self._volatility)
+                                                         * self._price)))
+        self._id += 1
+
+    def _amount(self):
+        return Decimal(int(self._random.paretovariate(1.5) * 1000)).scaleb(-4)
+
+    def ticks(self, count):
+        ''' Generate trades.
+
+        :param int count: number of ticks to generate.
+        :rtype: list(~cryptomate.market.data.Tick)
+        '''
+        result = []
+        for _ in range(count):
+            self._step()
+            result.append(Tick(
+                id=self._id,
+                timestamp=int(self._time),
+                type='buy' if self._random.random() < 0.5 else 'sell',
+                amount=self._amount(),
+                price=self._price * self._tick_size,
+            ))
+        return result
+
+    def snapshot(self, depth):
+        ''' Generate a full order book around current price.
+
+        :param int depth: number of price levels on each side.
+        :rtype: list(~cryptomate.market.data.OrderUpdate)
+        '''
+        timestamp = int(self._time)
+        result = []
+        for level in range(1, depth + 1):
+            for side, price in (('buy', self._price - level), ('sell', self._price + level)):
+                self._id += 1
+                result.append(OrderUpdate(self._id, timestamp, side, self._amount(),
+                                          price * self._tick_size))
+        return result
+
+    def order_updates(self, count, *, depth=20):
+        ''' Generate order book updates within ``depth`` levels of current price.
+
+        About one update in five removes its price level. Price does not move while
+        generating updates, so a book built from :meth:`snapshot` keeps its depth.
+
+        :param int count: number of updates to generate.
+        :param int depth: maximum distance of updated levels from current price, in ticks.
+        :rtype: list(~cryptomate.market.data.OrderUpdate)
+        '''
+        rnd = self._random
+        result = []
+        for _ in range(count):
+            self._step(move=False)
+            distance = min(depth, int(rnd.expovariate(3 / depth)) + 1)
+            side = 'buy' if rnd.random() < 0.5 else 'sell'
+            price = self._price - distance if side == 'buy' else self._price + distance
+            amount = Decimal(0) if rnd.random() < 0.2 else self._amount()
+            result.append(OrderUpdate(self._id, int(self._time), side, amount,
+                                      price * self._tick_size))
+        return result
+
+    def binance_messages(self, count, *, symbol='btcusdt'):
+        ''' Generate trades as Binance combined stream messages.
+
+        :param int count: number of messages to generate.
+        :param str symbol: market symbol.
+        :return: JSON-encoded messages.
+        :rtype: list(str)
+        '''
+        stream = '%s@trade' % symbol
+        result = []
+        for _ in range(count):
+            tick, = self.ticks(1)
+            millis = int(self._time * 1000)
+            result.append(json.dumps({'stream': stream, 'data': {
+                'e': 'trade', 'E': millis, 's': symbol.upper(), 't': tick.id,
+                'p': str(tick.price), 'q': str(tick.amount),
+                'b': tick.id * 2, 'a': tick.id * 2 + 1,
+                'T': millis, 'm': tick.type == 'sell', 'M': True,
+            }}, separators=(',', ':')))
+        return result
+
+
+@register
+class SyntheticFeed(Feed):
+    ''' Market feed that generates synthetic events for any symbol
+
+    Events are only generated when :meth:`generate` is called, or continuously
+    at a given rate after :meth:`start`.
+
+    :param int seed: random seed of generators. Each symbol gets its own generator.
+    '''
+    name = 'synthetic'
+    __slots__ = ('_seed', '_enabled', '_generators', '_task', '_closed')
+
+    def __init__(self, *, callback, on_error, seed=0):
+        super().__init__(callback=callback, on_error=on_error)
+        self._seed = seed
+        self._enabled = set()
+        self._generators = {}
+        self._task = None
+        self._closed = False
+
+    # Feed interface
+
+    def close(self):
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+
+    async def wait_closed(self):
+        if self._task:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def enable(self, symbol, event):
+        if (symbol, event) in self._enabled:
+            raise ValueError('%s [%s] is already enabled' % (symbol, event.name.lower()))
+        self._enabled.add((symbol, event))
+        if symbol not in self._generators:
+            self._generators[symbol] = MarketGenerator(seed='%s:%s' % (self._seed, symbol))
+
+    async def disable(self, symbol, event):
+        self._enabled.remove((symbol, event))
+
+    # Generation
+
+    def generate(self, symbol, event, count, *, depth=20):
+        ''' Emit events on an enabled stream.
+
+        Ticks are emitted one per callback, order book updates as a single batch.
+
+        :param str symbol: market symbol.
+        :param FeedEvent event: event stream.
+        :param int count: number of events to emit.
+        :param int depth: maximum distance of order updates from current price, in ticks.
+        '''
+        if (symbol, event) not in self._enabled:
+            raise ValueError('%s [%s] is not enabled' % (symbol, event.name.lower()))
+        generator = self._generators[symbol]
+        if event is FeedEvent.TICK:
+            for tick in generator.ticks(count):
+                self.callback(self, symbol, event, tick)
+        else:
+            self.callback(self, symbol, event, generator.order_updates(count, depth=depth))
+
+    def start(self, rate, *, batch=100):
+        ''' Emit events continuously on all enabled streams.
+
+        :param float rate: number of events per second on each stream.
+        :param int batch: number of events emitted per stream at once.
+        '''
+        if self._closed:
+            raise RuntimeError('feed is closed')
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run(rate, batch))
+
+    async def _run(self, rate, batch):
+        while True:
+            for symbol, event in list(self._enabled):
+                self.generate(symbol, event, batch)
+            await asyncio.sleep(batch / rate)
@@ -1,3 +1,4 @@
 from cryptomate.history.base import History, Reader, Writer
+from cryptomate.history.file import FileHistory
 
-__all__ = ('History', 'Reader', 'Writer')
+__all__ = ('History', 'Reader', 'Writer', 'FileHistory')
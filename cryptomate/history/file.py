@@ -0,0 +1,222 @@
+import asyncio
+import os
+from decimal import Decimal
+from cryptomate.history.base import History, Reader, Writer
+from cryptomate.market.data import Candle, OrderUpdate, Tick
+
+CANDLES = 'candles.csv'
+TICKS = 'ticks.csv'
+ORDER_UPDATES = 'orderbook.csv'
+SNAPSHOTS = 'orderbook-snapshots.csv'
+
+
+def _run(func, *args):
+    return asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+
+class FileHistory(History):
+    ''' Market history stored as flat text files, one directory per feed.
+
+    Each feed gets a ``<root>/<name>/<symbol>`` directory, holding one comma-separated
+    file per kind of data, in chronological order. File access runs in the default executor.
+
+    :param str root: base directory of history data.
+    :param float snapshot_interval: minimum number of seconds between two order book
+                                    snapshots, as written by writers.
+    '''
+    __slots__ = ('root', 'snapshot_interval')
+
+    def __init__(self, root, *, snapshot_interval=3600):
+        self.root = root
+        self.snapshot_interval = snapshot_interval
+
+    def _path(self, description):
+        return os.path.join(self.root, description.name, description.symbol)
+
+    async def get_reader(self, description):
+        return await _run(FileReader, self._path(description))
+
+    async def get_writer(self, description):
+        path = self._path(description)
+        await _run(lambda: os.makedirs(path, exist_ok=True))
+        return FileWriter(path, snapshot_interval=self.snapshot_interval)
+
+
+class FileReader(Reader):
+    ''' A read handle to history files of a single feed.
+
+    :param str path: directory of feed history.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.has_candles = os.path.exists(os.path.join(path, CANDLES))
+        self.has_ticks = os.path.exists(os.path.join(path, TICKS))
+        self.has_order_updates = (os.path.exists(os.path.join(path, ORDER_UPDATES))
+                                  or os.path.exists(os.path.join(path, SNAPSHOTS)))
+        bounds = [self._bounds(name) for name in (CANDLES, TICKS, ORDER_UPDATES, SNAPSHOTS)]
+        bounds = [bound for bound in bounds if bound]
+        self.earliest_timestamp = min((bound[0] for bound in bounds), default=None)
+        self.newest_timestamp = max((bound[1] for bound in bounds), default=None)
+
+    def _bounds(self, name):
+        ''' Timestamps of first and last line of a file, `None` if empty or missing '''
+        try:
+            with open(os.path.join(self.path, name), 'rb') as fd:
+                first = fd.readline()
+                if not first:
+                    return None
+                last = self._last_line(fd)
+        except FileNotFoundError:
+            return None
+        column = 0 if name in (CANDLES, SNAPSHOTS) else 1
+        return int(first.split(b',')[column]), int(last.split(b',')[column])
+
+    @staticmethod
+    def _last_line(fd):
+        ''' Read the last line of a file, reading backwards as far as needed '''
+        position = fd.seek(0, os.SEEK_END)
+        data, step = b'', 4096
+        while position:
+            step = min(step * 2, position)
+            position -= step
+            fd.seek(position)
+            data = fd.read(step) + data
+            start = data.rfind(b'\n', 0, len(data) - 1)
+            if start >= 0:
+                return data[start + 1:].rstrip(b'\n')
+        return data.rstrip(b'\n')
+
+    def _scan(self, name, column, start, stop):
+        try:
+            with open(os.path.join(self.path, name), encoding='ascii') as fd:
+                for line in fd:
+                    fields = line.rstrip('\n').split(',')
+                    timestamp = int(fields[column])
+                    if timestamp >= stop:
+                        break
+                    if timestamp >= start:
+                        yield fields
+        except FileNotFoundError:
+            return
+
+    def _read_candles(self, start, stop):
+        return [Candle(int(timestamp), *(Decimal(value) if value else None
+                                         for value in (open_, high, low, close)),
+                       Decimal(volume))
+                for timestamp, open_, high, low, close, volume
+                in self._scan(CANDLES, 0, start, stop)]
+
+    def _read_ticks(self, start, stop):
+        return [Tick(int(id_), int(timestamp), type_ or None, Decimal(amount), Decimal(price))
+                for id_, timestamp, type_, amount, price in self._scan(TICKS, 1, start, stop)]
+
+    def _read_order_updates(self, start, stop):
+        return [OrderUpdate(int(id_), int(timestamp), type_, Decimal(amount), Decimal(price))
+                for id_, timestamp, type_, amount, price
+                in self._scan(ORDER_UPDATES, 1, start, stop)]
+
+    def _read_snapshot(self, timestamp):
+        snapshot = None
+        for fields in self._scan(SNAPSHOTS, 0, 0, timestamp):
+            snapshot = fields
+        if snapshot is None:
+            return None
+        levels = iter(snapshot[1:])
+        return [OrderUpdate(None, int(snapshot[0]), type_, Decimal(amount), Decimal(price))
+                for type_, price, amount in zip(levels, levels, levels)]
+
+    async def read_candles(self, start, stop):
+        return await _run(self._read_candles, start, stop)
+
+    async def read_ticks(self, start, stop):
+        return await _run(self._read_ticks, start, stop)
+
+    async def read_order_updates_snapshot(self, timestamp):
+        ''' Read the most recent order book snapshot before a point in time.
+
+        :param int timestamp: timestamp of point in time before which the snapshot must
+                              has been taken.
+        :return: Order book snapshot, as a list of updates setting every level, or `None`.
+        '''
+        return await _run(self._read_snapshot, timestamp)
+
+    async def read_order_updates(self, start, stop):
+        return await _run(self._read_order_updates, start, stop)
+
+
+class FileWriter(Writer):
+    ''' A write handle to history files of a single feed.
+
+    Data is buffered in memory until :meth:`flush` is called.
+
+    :param str path: directory of feed history.
+    :param float snapshot_interval: minimum number of seconds between two order book snapshots.
+    '''
+
+    def __init__(self, path, *, snapshot_interval=3600):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.newest_timestamp = None
+        self._buffers = {CANDLES: [], TICKS: [], ORDER_UPDATES: [], SNAPSHOTS: []}
+        self._last_snapshot = None
+
+    async def flush(self):
+        buffers = {name: lines for name, lines in self._buffers.items() if lines}
+        for name in buffers:
+            self._buffers[name] = []
+        if buffers:
+            await _run(self._write, buffers)
+
+    def _write(self, buffers):
+        for name, lines in buffers.items():
+            with open(os.path.join(self.path, name), 'a', encoding='ascii') as fd:
+                fd.write(''.join(lines))
+
+    def _advance(self, timestamp):
+        if self.newest_timestamp is None or timestamp > self.newest_timestamp:
+            self.newest_timestamp = timestamp
+
+    def write_candles(self, candles):
+        buffer = self._buffers[CANDLES]
+        for candle in candles:
+            buffer.append('%d,%s,%s,%s,%s,%s\n' % (
+                candle.timestamp, *('' if value is None else value
+                                    for value in candle[1:5]), candle.volume))
+        if candles:
+            self._advance(candles[-1].timestamp)
+
+    def write_ticks(self, ticks):
+        buffer = self._buffers[TICKS]
+        for tick in ticks:
+            buffer.append('%d,%d,%s,%s,%s\n' % (tick.id, tick.timestamp, tick.type or '',
+                                                 tick.amount, tick.price))
+        if ticks:
+            self._advance(ticks[-1].timestamp)
+
+    def write_order_updates(self, updates, *, order_book):
+        ''' Write a set of order updates to the dataset
+
+        A snapshot of ``order_book`` replaces the updates every ``snapshot_interval`` seconds.
+
+        :param updates: Order update events to write to the dataset.
+        :paramtype updates: ~collections.abc.Sequence(OrderUpdate)
+        :param order_book: Complete view of the order book, updates included.
+        '''
+        if not updates:
+            return
+        timestamp = updates[-1].timestamp
+        self._advance(timestamp)
+        if (self._last_snapshot is None
+                or timestamp - self._last_snapshot >= self.snapshot_interval):
+            levels = ([('buy', price, amount) for price, amount in order_book.bids()]
+                      + [('sell', price, amount) for price, amount in order_book.asks()])
+            self._buffers[SNAPSHOTS].append('%d%s\n' % (timestamp, ''.join(
+                ',%s,%s,%s' % level for level in levels)))
+            self._last_snapshot = timestamp
+            return
+
+        buffer = self._buffers[ORDER_UPDATES]
+        for update in updates:
+            buffer.append('%d,%d,%s,%s,%s\n' % (update.id, update.timestamp, update.type,
+                                                 update.amount, update.price))
@@ -0,0 +1,8 @@
+from cryptomate.instrumentation.histogram import Histogram, Summary
+from cryptomate.instrumentation.latency import (Instruments, LoopLagMonitor, clock,
+                                                default_instruments, record, timed)
+
+__all__ = (
+    'Histogram', 'Summary',
+    'Instruments', 'LoopLagMonitor', 'clock', 'default_instruments', 'record', 'timed',
+)
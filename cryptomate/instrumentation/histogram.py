@@ -0,0 +1,123 @@
+from collections import namedtuple
+
+Summary = namedtuple('Summary', 'count min mean p50 p90 p99 p999 max', module=__name__)
+Summary.__doc__ = ''' Statistics of values recorded in a histogram.
+
+Percentiles are upper bounds of the bucket they fall in. All fields are `None`
+if no value was recorded.
+
+:param int count: Number of recorded values.
+:param int min: Lowest recorded value.
+:param float mean: Average of recorded values.
+:param int p50: Median.
+:param int p90: 90th percentile.
+:param int p99: 99th percentile.
+:param int p999: 99.9th percentile.
+:param int max: Highest recorded value.
+'''
+
+
+class Histogram:
+    ''' Fixed-memory histogram of non-negative integers, with bounded relative error.
+
+    Values are counted in log-linear buckets, as in HdrHistogram: every power of two is
+    split into ``2 ** (precision - 1)`` buckets, so the relative error on any reported
+    percentile is below ``2 ** (1 - precision)``. Recording a value is a few integer
+    operations and a list increment, with no allocation.
+
+    :param int precision: number of significant bits kept for each value.
+    :param int highest: highest trackable value. Larger values are counted as ``highest``.
+    '''
+    __slots__ = ('_bits', '_highest', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, precision=7, highest=1 << 40):
+        if precision < 2:
+            raise ValueError('precision must be at least 2')
+        self._bits = precision
+        self._highest = highest
+        self.counts = [0] * (self._index(highest) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = value.bit_length() - self._bits
+        if shift <= 0:
+            return value
+        return (shift << (self._bits - 1)) + (value >> shift)
+
+    def _upper_bound(self, index):
+        half = 1 << (self._bits - 1)
+        if index < 2 * half:
+            return index
+        shift = index // half - 1
+        return ((index - shift * half + 1) << shift) - 1
+
+    def record(self, value):
+        ''' Count a single value.
+
+        :param int value: value to count. Negative values are counted as 0.
+        '''
+        if value < 0:
+            value = 0
+        elif value > self._highest:
+            value = self._highest
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        ''' Add all values counted by another histogram with the same settings. '''
+        if (other._bits, other._highest) != (self._bits, self._highest):
+            raise ValueError('cannot merge histograms with different settings')
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent):
+        ''' Get value below which given percentage of counted values fall.
+
+        :param float percent: percentage, between 0 and 100.
+        :return: upper bound of bucket the percentile falls in, or `None` if histogram is empty.
+        '''
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def summary(self):
+        ''' Compute statistics over counted values.
+
+        :rtype: Summary
+        '''
+        if not self.count:
+            return Summary(0, None, None, None, None, None, None, None)
+        return Summary(
+            count=self.count,
+            min=self.min,
+            mean=self.total / self.count,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+            p999=self.percentile(99.9),
+            max=self.max,
+        )
+
+    def reset(self):
+        ''' Forget all counted values '''
+        self.counts = [0] * len(self.counts)
+        self.count = self.total = 0
+        self.min = self.max = None
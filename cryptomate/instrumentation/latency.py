@@ -0,0 +1,149 @@
+import asyncio
+import functools
+import time
+from cryptomate.instrumentation.histogram import Histogram
+
+try:
+    clock = time.perf_counter_ns
+except AttributeError:  # python < 3.7
+    def clock():
+        ''' Monotonic timestamp, in nanoseconds '''
+        return int(time.perf_counter() * 1000000000)
+
+
+class Instruments:
+    ''' Latency histograms for hot-path stages, per stage and symbol.
+
+    Call sites take timestamps with :func:`clock` and hand elapsed time over to
+    :meth:`record`. Histograms are only ever updated from the event loop thread, so
+    recording needs no locking. Well-known stages are:
+
+    * ``feed.parse``: from a message arriving on a feed connection to its event being ready.
+    * ``feed.callback``: time spent in the feed callback, including strategy handling.
+    * ``account.add_order``: time for :meth:`~cryptomate.trading.account.Account.add_order`
+      to return.
+    * ``loop.lag``: delay of event loop callbacks, see :class:`LoopLagMonitor`.
+
+    :ivar bool enabled: whether :meth:`record` does anything.
+    :param int precision: significant bits of histograms, see
+                          :class:`~cryptomate.instrumentation.histogram.Histogram`.
+    '''
+    __slots__ = ('enabled', '_precision', '_histograms')
+
+    def __init__(self, *, enabled=True, precision=7):
+        self.enabled = enabled
+        self._precision = precision
+        self._histograms = {}       # (stage, symbol) => Histogram
+
+    def record(self, stage, symbol, elapsed):
+        ''' Count time spent in a stage.
+
+        :param str stage: stage name.
+        :param symbol: market symbol the measure applies to, `None` if not applicable.
+        :type symbol: str or None
+        :param int elapsed: elapsed time in nanoseconds.
+        '''
+        if not self.enabled:
+            return
+        try:
+            histogram = self._histograms[stage, symbol]
+        except KeyError:
+            histogram = self._histograms[stage, symbol] = Histogram(self._precision)
+        histogram.record(elapsed)
+
+    def histogram(self, stage, symbol=None):
+        ''' Get the histogram of a stage, or `None` if nothing was recorded for it. '''
+        return self._histograms.get((stage, symbol))
+
+    def snapshot(self, *, by_symbol=True):
+        ''' Compute latency statistics for all stages.
+
+        :param bool by_symbol: whether to keep symbols apart. If `False`, measures of all
+                               symbols are merged and reported with symbol `None`.
+        :return: statistics in nanoseconds, mapped by ``(stage, symbol)``.
+        :rtype: dict(tuple, ~cryptomate.instrumentation.histogram.Summary)
+        '''
+        if by_symbol:
+            return {key: histogram.summary() for key, histogram in self._histograms.items()}
+
+        merged = {}
+        for (stage, _), histogram in self._histograms.items():
+            if stage not in merged:
+                merged[stage] = Histogram(self._precision)
+            merged[stage].merge(histogram)
+        return {(stage, None): histogram.summary() for stage, histogram in merged.items()}
+
+    def dump(self, *, by_symbol=True):
+        ''' Render latency statistics as a text table, in microseconds. '''
+        lines = ['%-24s %-12s %10s %10s %10s %10s %10s %10s %10s' % (
+            'stage', 'symbol', 'count', 'mean', 'p50', 'p90', 'p99', 'p99.9', 'max')]
+        snapshot = self.snapshot(by_symbol=by_symbol)
+        for (stage, symbol), summary in sorted(snapshot.items(), key=lambda item: (
+                item[0][0], item[0][1] or '')):
+            lines.append('%-24s %-12s %10d %10.1f %10.1f %10.1f %10.1f %10.1f %10.1f' % (
+                stage, symbol or '-', summary.count, summary.mean / 1000, summary.p50 / 1000,
+                summary.p90 / 1000, summary.p99 / 1000, summary.p999 / 1000, summary.max / 1000))
+        return '\n'.join(lines)
+
+    def reset(self):
+        ''' Forget all measures '''
+        self._histograms.clear()
+
+
+class LoopLagMonitor:
+    ''' Measures how late the event loop runs scheduled callbacks.
+
+    A callback is scheduled every ``interval`` seconds and the difference between the
+    time it was due and the time it actually ran is recorded as stage ``loop.lag``.
+
+    :param Instruments instruments: where to record measures.
+    :param float interval: delay in seconds between two measures.
+    '''
+    __slots__ = ('_instruments', '_interval', '_handle', '_due')
+
+    def __init__(self, instruments=None, *, interval=0.1):
+        self._instruments = instruments or default_instruments
+        self._interval = interval
+        self._handle = None
+        self._due = None
+
+    def start(self):
+        ''' Start measuring. Must be called from within the event loop. '''
+        if self._handle is None:
+            self._schedule(asyncio.get_event_loop())
+
+    def close(self):
+        ''' Stop measuring '''
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self, loop):
+        self._due = loop.time() + self._interval
+        self._handle = loop.call_at(self._due, self._measure, loop)
+
+    def _measure(self, loop):
+        self._instruments.record('loop.lag', None, int((loop.time() - self._due) * 1000000000))
+        self._schedule(loop)
+
+
+def timed(stage, instruments=None):
+    ''' Decorator recording the duration of a coroutine function as a stage.
+
+    :param str stage: stage name.
+    :param Instruments instruments: where to record measures. Default instruments if `None`.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                (instruments or default_instruments).record(stage, None, clock() - start)
+        return wrapper
+    return decorator
+
+
+default_instruments = Instruments()
+record = default_instruments.record
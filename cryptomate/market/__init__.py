@@ -1,7 +1,7 @@
 from cryptomate.market.data import Candle, FeedDescription, Tick
-from cryptomate.market.engine import Engine
+from cryptomate.market.engine import Engine, OverflowPolicy
 
 __all__ = (
     'Candle', 'FeedDescription', 'Tick',
-    'Engine',
+    'Engine', 'OverflowPolicy',
 )
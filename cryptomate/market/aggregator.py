@@ -1,14 +1,61 @@
+from collections import deque
+from cryptomate.market.data import Candle
 
 
 class Aggregator:
     ''' Aggregated candle data over a configurable time period.
 
     :ivar int period: Aggregation timeframe in seconds.
+    :param int size: Maximum number of past candles to keep.
     '''
+    __slots__ = ('period', '_candles', '_current')
+
+    def __init__(self, period, *, size=1000):
+        if period <= 0:
+            raise ValueError('period must be positive')
+        self.period = period
+        self._candles = deque(maxlen=size)  # finalized candles, newest last
+        self._current = None                # [timestamp, open, high, low, close, volume]
+
+    def update(self, ticks):
+        ''' Aggregate new ticks.
+
+        Ticks must be given in chronological order. Periods without any tick yield
+        candles with a zero volume.
+
+        :param ticks: Ticks to aggregate.
+        :paramtype ticks: ~collections.abc.Iterable(~cryptomate.market.data.Tick)
+        :return: Candles finalized by those ticks, oldest first.
+        :rtype: list(~cryptomate.market.data.Candle)
+        '''
+        period = self.period
+        finalized = []
+        current = self._current
+        for tick in ticks:
+            timestamp = tick.timestamp - tick.timestamp % period
+            price = tick.price
+            if current is not None and current[0] == timestamp:
+                if price > current[2]:
+                    current[2] = price
+                elif price < current[3]:
+                    current[3] = price
+                current[4] = price
+                current[5] += tick.amount
+                continue
+
+            if current is not None:
+                finalized.append(Candle(*current))
+                for empty in range(current[0] + period, timestamp, period):
+                    finalized.append(Candle(empty, None, None, None, None, 0))
+            current = [timestamp, price, price, price, price, tick.amount]
+
+        self._current = current
+        self._candles.extend(finalized)
+        return finalized
 
     def __len__(self):
         ''' Number of candles currently buffered. '''
-        raise NotImplementedError
+        return len(self._candles) + (self._current is not None)
 
     def __getitem__(self, idx):
         ''' Read candle.
@@ -17,4 +64,13 @@ class Aggregator:
                         for past candles. Negative numbers count from the end.
         :return: a :class:`~cryptomate.market.data.Candle` instance.
         '''
-        raise NotImplementedError
+        length = len(self)
+        if idx < 0:
+            idx += length
+        if not 0 <= idx < length:
+            raise IndexError('candle index out of range')
+        if self._current is not None:
+            if idx == 0:
+                return Candle(*self._current)
+            idx -= 1
+        return self._candles[-1 - idx]
@@ -0,0 +1,271 @@
+''' Consolidated view of the order books of one asset pair on several platforms.
+
+Platform prices are adjusted for fees, so that levels from different platforms compare
+by what a trade would actually cost or yield: bids are lowered and asks raised by the
+platform fee rate.
+'''
+import re
+from bisect import bisect_left, insort
+from collections import namedtuple
+from decimal import Decimal
+from cryptomate.market.data import FeedDescription
+
+#: Asset names used by some platforms, with their common name.
+ALIASES = {'xbt': 'btc', 'xdg': 'doge'}
+
+_SEPARATORS = re.compile(r'[-/_: ]')
+
+Leg = namedtuple('Leg', 'name amount price', module=__name__)
+Leg.__doc__ = ''' Part of a trade to execute on a single platform.
+
+:param str name: Platform name.
+:param ~decimal.Decimal amount: Volume to trade on the platform, in traded asset.
+:param ~decimal.Decimal price: Worst platform price reached, before fees, suitable as
+                               limit price of the order.
+'''
+
+Route = namedtuple('Route', 'amount price legs', module=__name__)
+Route.__doc__ = ''' Best split of a trade across platforms.
+
+:param ~decimal.Decimal amount: Volume that can be traded, at most the requested volume.
+:param ~decimal.Decimal price: Average price of the trade, fees included.
+:param legs: Trades to execute on each platform, in order of price.
+:type legs: tuple(Leg)
+'''
+
+
+def normalise_symbol(symbol, aliases=ALIASES):
+    ''' Convert a platform market symbol to a form common to all platforms.
+
+    Symbols are lowercased, separators removed and asset aliases resolved, so that
+    ``XBT/USDT``, ``btc-usdt`` and ``BTCUSDT`` are all ``btcusdt``.
+
+    :param str symbol: market symbol, as used by a platform.
+    :param dict aliases: asset names to replace, with their replacement.
+    :rtype: str
+    '''
+    symbol = symbol.lower()
+    assets = _SEPARATORS.split(symbol)
+    if len(assets) == 1:
+        for alias, name in aliases.items():
+            if symbol.startswith(alias):
+                return name + symbol[len(alias):]
+    return ''.join(aliases.get(asset, asset) for asset in assets)
+
+
+class _Venue:
+    ''' Levels of a platform order book, as currently merged into the consolidated book '''
+    __slots__ = ('name', 'book', 'fee', 'levels')
+
+    def __init__(self, name, book, fee):
+        self.name = name
+        self.book = book
+        self.fee = fee
+        self.levels = {'buy': {}, 'sell': {}}
+
+
+class ConsolidatedBook:
+    ''' Merged order book of an asset pair across platforms.
+
+    Platform order books are registered with :meth:`add_venue`, or :meth:`subscribe` when
+    they come from an :class:`~cryptomate.market.engine.Engine`. After a platform book has
+    been updated, :meth:`refresh` merges the changed levels only, so the best prices and
+    aggregated depth are always current.
+
+    :param str symbol: market symbol, in any platform form.
+    :param callback: invoked after each refresh. Has form ``callback(book, name)``, where
+                     ``name`` is the platform whose book changed.
+    :ivar str symbol: normalised market symbol.
+    :ivar buy: Aggregated bid side, fee-adjusted price to total volume.
+    :vartype buy: ~collections.abc.Mapping(~decimal.Decimal, ~decimal.Decimal)
+    :ivar sell: Aggregated ask side, fee-adjusted price to total volume.
+    :vartype sell: ~collections.abc.Mapping(~decimal.Decimal, ~decimal.Decimal)
+    '''
+    __slots__ = ('symbol', 'callback', 'buy', 'sell', '_venues', '_sources', '_bids', '_asks')
+
+    def __init__(self, symbol, *, callback=None):
+        self.symbol = normalise_symbol(symbol)
+        self.callback = callback
+        self.buy = {}
+        self.sell = {}
+        self._venues = {}           # name => _Venue
+        self._sources = {'buy': {}, 'sell': {}}     # adjusted price => {name: (price, amount)}
+        self._bids = []             # sorted adjusted prices of buy side
+        self._asks = []             # sorted adjusted prices of sell side
+
+    # Platforms
+
+    def add_venue(self, name, order_book, *, symbol=None, fee=0):
+        ''' Merge the order book of a platform.
+
+        :param str name: platform name.
+        :param ~cryptomate.market.orderbook.OrderBook order_book: platform order book.
+                    It must be refreshed after every update.
+        :param str symbol: platform market symbol, checked against :attr:`symbol`.
+        :param fee: platform fee rate, for instance ``Decimal('0.001')`` for 0.1%.
+        :type fee: ~decimal.Decimal or int
+        '''
+        if name in self._venues:
+            raise ValueError('venue %s is already consolidated' % name)
+        if symbol is not None and normalise_symbol(symbol) != self.symbol:
+            raise ValueError('symbol %s of %s does not match %s' % (symbol, name, self.symbol))
+        venue = self._venues[name] = _Venue(name, order_book, Decimal(fee))
+        self._resync(venue)
+
+    def remove_venue(self, name):
+        ''' Stop merging the order book of a platform '''
+        venue = self._venues.pop(name)
+        for type_, levels in venue.levels.items():
+            for price in list(levels):
+                self._set(venue, type_, price, 0)
+
+    async def subscribe(self, engine, name, symbol, *, fee=0):
+        ''' Subscribe to a platform order book and merge it.
+
+        :param ~cryptomate.market.engine.Engine engine: engine to subscribe through.
+        :param str name: platform name.
+        :param str symbol: platform market symbol.
+        :param fee: platform fee rate.
+        :return: the :class:`~cryptomate.market.engine.OrderBookSubscription`. Closing it
+                 does not remove the venue.
+        '''
+        if name in self._venues:
+            raise ValueError('venue %s is already consolidated' % name)
+        if normalise_symbol(symbol) != self.symbol:
+            raise ValueError('symbol %s of %s does not match %s' % (symbol, name, self.symbol))
+        def on_updates(description, updates):
+            if name in self._venues:    # earlier updates are merged by add_venue
+                self.refresh(name, updates)
+
+        subscription = await engine.subscribe_orderbook(FeedDescription(name, symbol, None),
+                                                        on_updates)
+        self.add_venue(name, subscription.order_book, fee=fee)
+        return subscription
+
+    def refresh(self, name, updates=None):
+        ''' Merge changes of a platform book.
+
+        :param str name: platform name.
+        :param updates: updates just applied to the platform book. `None` to merge the
+                        whole book, which is also done when updates do not account for all
+                        changes, such as after the book was cleared for a snapshot.
+        :paramtype updates: ~collections.abc.Iterable(~cryptomate.market.data.OrderUpdate)
+        '''
+        venue = self._venues[name]
+        book = venue.book
+        if updates is None:
+            self._resync(venue)
+        else:
+            sides = {'buy': book.buy, 'sell': book.sell}
+            for update in updates:
+                self._set(venue, update.type, update.price,
+                          sides[update.type].get(update.price, 0))
+            if (len(venue.levels['buy']) != len(book.buy)
+                    or len(venue.levels['sell']) != len(book.sell)):
+                self._resync(venue)
+        if self.callback is not None:
+            self.callback(self, name)
+
+    def _resync(self, venue):
+        for type_, levels in (('buy', venue.book.buy), ('sell', venue.book.sell)):
+            for price in [price for price in venue.levels[type_] if price not in levels]:
+                self._set(venue, type_, price, 0)
+            for price, amount in levels.items():
+                self._set(venue, type_, price, amount)
+
+    def _set(self, venue, type_, price, amount):
+        ''' Set the volume of a platform level, updating aggregated levels by difference '''
+        levels = venue.levels[type_]
+        previous = levels.get(price, 0)
+        if amount == previous:
+            return
+        if amount:
+            levels[price] = amount
+        else:
+            del levels[price]
+
+        if type_ == 'buy':
+            adjusted, totals, prices = price * (1 - venue.fee), self.buy, self._bids
+        else:
+            adjusted, totals, prices = price * (1 + venue.fee), self.sell, self._asks
+        sources = self._sources[type_].setdefault(adjusted, {})
+        if amount:
+            sources[venue.name] = (price, amount)
+        else:
+            sources.pop(venue.name, None)
+
+        if sources:
+            if adjusted not in totals:
+                insort(prices, adjusted)
+                totals[adjusted] = amount
+            else:
+                totals[adjusted] += amount - previous
+        else:
+            del self._sources[type_][adjusted]
+            if adjusted in totals:
+                del totals[adjusted]
+                del prices[bisect_left(prices, adjusted)]
+
+    # Queries
+
+    @property
+    def best_bid(self):
+        ''' Highest fee-adjusted buy price over all platforms, or `None` if there are none. '''
+        return self._bids[-1] if self._bids else None
+
+    @property
+    def best_ask(self):
+        ''' Lowest fee-adjusted sell price over all platforms, or `None` if there are none. '''
+        return self._asks[0] if self._asks else None
+
+    def bids(self):
+        ''' Iterate over aggregated buy side levels, best first.
+
+        :rtype: ~collections.abc.Iterator(tuple(~decimal.Decimal, ~decimal.Decimal))
+        '''
+        buy = self.buy
+        return ((price, buy[price]) for price in reversed(self._bids))
+
+    def asks(self):
+        ''' Iterate over aggregated sell side levels, best first.
+
+        :rtype: ~collections.abc.Iterator(tuple(~decimal.Decimal, ~decimal.Decimal))
+        '''
+        sell = self.sell
+        return ((price, sell[price]) for price in self._asks)
+
+    def route(self, type, amount):
+        ''' Find where to trade a volume at the best price.
+
+        Walks the opposite side of the consolidated book from its best level, only as far
+        as needed to fill ``amount``.
+
+        :param str type: ``buy`` or ``sell``, the side of the trade.
+        :param ~decimal.Decimal amount: volume to trade, in traded asset.
+        :return: the best split of the trade, possibly for less than ``amount`` if the book
+                 is not deep enough.
+        :rtype: Route
+        '''
+        if type == 'buy':
+            prices, sources = self._asks, self._sources['sell']
+        elif type == 'sell':
+            prices, sources = reversed(self._bids), self._sources['buy']
+        else:
+            raise ValueError('invalid trade type %s' % type)
+
+        remaining, cost, amounts, limits = amount, 0, {}, {}
+        for adjusted in prices:
+            for name, (price, available) in sources[adjusted].items():
+                if available >= remaining:
+                    available = remaining
+                remaining -= available
+                cost += available * adjusted
+                amounts[name] = amounts.get(name, 0) + available
+                limits[name] = price
+                if not remaining:
+                    break
+            if not remaining:
+                break
+        filled = amount - remaining
+        return Route(filled, cost / filled if filled else None,
+                     tuple(Leg(name, total, limits[name]) for name, total in amounts.items()))
@@ -1,36 +1,334 @@
+import asyncio
+import inspect
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from enum import Enum, auto
+from cryptomate.market.aggregator import Aggregator
+from cryptomate.market.data import FeedDescription
+from cryptomate.market.feed import FeedEvent, default_factory
+from cryptomate.market.orderbook import OrderBook
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(Enum):
+    ''' What a queued subscription does when its queue is full '''
+    DROP_OLDEST = auto()    #: discard the oldest queued event to make room
+    CONFLATE = auto()       #: merge queued events into the latest state
+    DISCONNECT = auto()     #: close the subscription, discarding queued events
 
 
 class Engine:
     ''' Main port entry point, manageds feeds according to subscriptions.
+
+    Feeds are created from the factory on first use, and event streams are enabled
+    as long as at least one subscription needs them.
+
+    :param factory: creates feeds from descriptions. Defaults to
+                    :data:`~cryptomate.market.feed.factory.default_factory`.
+    :type factory: ~cryptomate.market.feed.factory.Factory
+    :param dict feed_options: additional arguments given to the factory when creating feeds,
+                              as a dictionary of options per feed name.
+    :param journal: where to record feed reconnections and streams being enabled or
+                    disabled, `None` to not audit them.
+    :type journal: ~cryptomate.auditing.journal.Journal
     '''
-    async def subscribe_orderbook(self, description, callback):
+
+    def __init__(self, *, factory=None, feed_options=None, journal=None):
+        self._factory = factory or default_factory
+        self._feed_options = feed_options or {}
+        self._journal = journal
+        self._feeds = {}            # name => Feed
+        self._subscriptions = {}    # (name, symbol, event) => list of subscriptions
+        self._books = {}            # (name, symbol) => OrderBook
+        self._pending = {}          # (name, symbol, event) => future resolved once enabled
+
+    async def subscribe_orderbook(self, description, callback, *, queue_size=None,
+                                  overflow=OverflowPolicy.CONFLATE, on_disconnect=None):
         ''' Subscribe to order book updates
 
         :param ~cryptomate.market.data.FeedDescription description: identification of feed.
         :param callback: a callable that will be invoked on every event.
+                         Has form ``callback(description, updates)``, the order book having
+                         been updated already. May be a coroutine function if queued.
+        :param int queue_size: maximum number of events waiting for the callback. `None`
+                               to invoke the callback inline, as soon as events arrive.
+        :param OverflowPolicy overflow: what to do when the queue is full.
+        :param on_disconnect: invoked with the subscription when it gets closed for falling
+                              behind, with :attr:`OverflowPolicy.DISCONNECT`.
         :return: a :class:`OrderBookSubscription` instance.
         '''
-        raise NotImplementedError
+        key = (description.name, description.symbol, FeedEvent.ORDERBOOK)
+        book = self._books.setdefault(key[:2], OrderBook())
+        subscription = OrderBookSubscription(self, description, callback, book,
+                                             queue_size=queue_size, overflow=overflow,
+                                             on_disconnect=on_disconnect)
+        await self._subscribe(key, subscription)
+        return subscription
 
-    async def subscribe_ticks(self, description, callback):
+    async def subscribe_ticks(self, description, callback, *, queue_size=None,
+                              overflow=OverflowPolicy.DROP_OLDEST, on_disconnect=None):
         ''' Subscribe to a market feed
 
         :param ~cryptomate.market.data.FeedDescription description: identification of feed.
         :param callback: a callable that will be invoked on every event.
+                         Has form ``callback(description, tick)``, the aggregator having
+                         been updated already. May be a coroutine function if queued.
+        :param int queue_size: maximum number of events waiting for the callback. `None`
+                               to invoke the callback inline, as soon as events arrive.
+        :param OverflowPolicy overflow: what to do when the queue is full.
+        :param on_disconnect: invoked with the subscription when it gets closed for falling
+                              behind, with :attr:`OverflowPolicy.DISCONNECT`.
         :return: a :class:`TickSubscription` instance.
         '''
+        key = (description.name, description.symbol, FeedEvent.TICK)
+        data = Aggregator(description.period) if description.period else None
+        subscription = TickSubscription(self, description, callback, data,
+                                        queue_size=queue_size, overflow=overflow,
+                                        on_disconnect=on_disconnect)
+        await self._subscribe(key, subscription)
+        return subscription
+
+    def close(self):
+        ''' Cancel all subscriptions and request shutdown of all feeds '''
+        self._clear()
+        for feed in self._feeds.values():
+            feed.close()
+
+    async def wait_closed(self):
+        ''' Wait until all feeds are completely shutdown.
+            Only valid after :meth:`close` has been called.
+        '''
+        feeds, self._feeds = self._feeds, {}
+        for feed in feeds.values():
+            await feed.wait_closed()
+
+    # Subscription management
+
+    def _clear(self):
+        ''' Cancel all subscriptions, without disabling their streams '''
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription._stop()
+        self._subscriptions.clear()
+
+    async def _subscribe(self, key, subscription):
+        subscriptions = self._subscriptions.setdefault(key, [])
+        subscriptions.append(subscription)
+        if len(subscriptions) == 1:
+            pending = self._pending[key] = asyncio.ensure_future(self._enable(key))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        pending = self._pending.get(key)
+        if pending is None:
+            return
+        try:
+            await asyncio.shield(pending)
+        except Exception:
+            subscriptions.remove(subscription)
+            if not subscriptions and self._subscriptions.get(key) is subscriptions:
+                del self._subscriptions[key]
+            raise
+
+    def _unsubscribe(self, key, subscription):
+        subscriptions = self._subscriptions.get(key)
+        if not subscriptions or subscription not in subscriptions:
+            return
+        subscriptions.remove(subscription)
+        if not subscriptions:
+            del self._subscriptions[key]
+            if key[2] is FeedEvent.ORDERBOOK:
+                self._books.pop(key[:2], None)
+            asyncio.ensure_future(self._disable(key))
+
+    async def _enable(self, key):
+        ''' Start receiving events for a stream '''
+        name, symbol, event = key
+        feed = self._feeds.get(name)
+        if feed is None:
+            feed = self._feeds[name] = self._factory.create(
+                FeedDescription(name, symbol, None),
+                callback=self._on_event, on_error=self._on_error,
+                **self._feed_options.get(name, {}))
+        await feed.enable(symbol, event)
+        if self._journal is not None:
+            self._journal.subscription_change(name, symbol, event, True)
+
+    async def _disable(self, key):
+        ''' Stop receiving events for a stream '''
+        name, symbol, event = key
+        feed = self._feeds.get(name)
+        if feed is not None:
+            try:
+                await feed.disable(symbol, event)
+            except Exception:
+                logger.exception('failed to disable %s %s [%s]', name, symbol, event.name.lower())
+            else:
+                if self._journal is not None:
+                    self._journal.subscription_change(name, symbol, event, False)
+
+    # Event dispatching
+
+    def _on_event(self, feed, symbol, event, data):
+        if event is FeedEvent.TICK:
+            self._dispatch_ticks((feed.name, symbol, event), (data,))
+        else:
+            self._dispatch_updates((feed.name, symbol, event), data)
+
+    def _on_error(self, feed, symbol, event, exc=None, retry=None, msg=None):
+        logger.warning('%s %s [%s]: %s%s', feed.name, symbol, event.name.lower(),
+                       msg or exc, '' if retry is None else ', retrying in %ss' % retry,
+                       exc_info=exc)
+        if retry is not None and self._journal is not None:
+            self._journal.feed_reconnect(feed.name, symbol, msg or exc)
+
+    def _dispatch_ticks(self, key, ticks):
+        for subscription in list(self._subscriptions.get(key, ())):
+            if subscription.data is not None:
+                subscription.data.update(ticks)
+            for tick in ticks:
+                subscription._deliver(tick)
+
+    def _dispatch_updates(self, key, updates, *, snapshot=False):
+        book = self._books.get(key[:2])
+        if book is None:
+            return
+        if snapshot:
+            book.clear()
+        book.update(updates)
+        for subscription in list(self._subscriptions.get(key, ())):
+            subscription._deliver(updates)
+
+
+class _Subscription(ABC):
+    ''' Delivery of events to a subscriber, inline or through a bounded queue '''
+    __slots__ = ('_engine', 'description', 'callback', 'overflow', 'on_disconnect', 'closed',
+                 'dropped', 'max_lag', '_queue', '_task')
+    event = None
+
+    def __init__(self, engine, description, callback, *, queue_size, overflow, on_disconnect):
+        if queue_size is not None and queue_size < 1:
+            raise ValueError('queue size must be at least 1')
+        self._engine = engine
+        self.description = description
+        self.callback = callback
+        self.overflow = overflow
+        self.on_disconnect = on_disconnect
+        self.closed = False
+        self.dropped = 0
+        self.max_lag = 0
+        self._queue = None if queue_size is None else deque(maxlen=queue_size)
+        self._task = None
+
+    @property
+    def lag(self):
+        ''' Number of events waiting for the callback '''
+        return len(self._queue) if self._queue else 0
+
+    def close(self):
+        ''' Cancel the subscription '''
+        self._stop()
+        self._engine._unsubscribe(
+            (self.description.name, self.description.symbol, self.event), self)
+
+    def _stop(self):
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._queue:
+            self._queue.clear()
+
+    def _deliver(self, data):
+        if self.closed:         # closed while its batch was being dispatched
+            return
+        queue = self._queue
+        if queue is None:
+            try:
+                self.callback(self.description, data)
+            except Exception:
+                logger.exception('%s %s [%s]: subscriber failed', self.description.name,
+                                 self.description.symbol, self.event.name.lower())
+            return
+
+        if len(queue) == queue.maxlen:
+            if self.overflow is OverflowPolicy.DISCONNECT:
+                self.dropped += len(queue) + 1
+                logger.warning('%s %s [%s]: subscriber fell %d events behind, disconnecting',
+                               self.description.name, self.description.symbol,
+                               self.event.name.lower(), len(queue))
+                self.close()
+                if self.on_disconnect is not None:
+                    self.on_disconnect(self)
+                return
+            if self.overflow is OverflowPolicy.CONFLATE:
+                self.dropped += len(queue)
+                data = self._conflate(queue, data)
+                queue.clear()
+            else:
+                self.dropped += 1
+        queue.append(data)      # discards oldest event if still full
+        if len(queue) > self.max_lag:
+            self.max_lag = len(queue)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    @abstractmethod
+    def _conflate(self, queue, data):
+        ''' Merge queued events and a new one into a single event '''
         raise NotImplementedError
 
+    async def _run(self):
+        queue, callback, description = self._queue, self.callback, self.description
+        while queue:
+            # events queued so far, then let other subscribers and feeds run
+            for _ in range(len(queue)):
+                if not queue:
+                    break
+                try:
+                    result = callback(description, queue.popleft())
+                    if inspect.isawaitable(result):
+                        await result
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception('%s %s [%s]: subscriber failed', description.name,
+                                     description.symbol, self.event.name.lower())
+            await asyncio.sleep(0)
+        self._task = None
+
 
-class OrderBookSubscription:
+class OrderBookSubscription(_Subscription):
     ''' An active subscription to a market order book
 
+    When queued, the order book may be ahead of the updates given to the callback.
+    Conflation merges queued updates into a single list, latest amount of each level.
+
     :ivar order_book: an :class:`~cryptomate.market.orderbook.OrderBook` instance with buffered
                       data for the feed.
+    :ivar description: the :class:`~cryptomate.market.data.FeedDescription` subscribed to.
+    :ivar int lag: number of events waiting for the callback.
+    :ivar int max_lag: highest lag so far.
+    :ivar int dropped: number of events discarded or conflated on queue overflow.
+    :ivar bool closed: whether the subscription was closed, by the subscriber, the engine,
+                       or for falling behind.
     '''
-    def close(self):
-        ''' Cancel the subscription '''
-        raise NotImplementedError
+    __slots__ = ('order_book',)
+    event = FeedEvent.ORDERBOOK
+
+    def __init__(self, engine, description, callback, order_book, *, queue_size=None,
+                 overflow=OverflowPolicy.CONFLATE, on_disconnect=None):
+        super().__init__(engine, description, callback, queue_size=queue_size,
+                         overflow=overflow, on_disconnect=on_disconnect)
+        self.order_book = order_book
+
+    def _conflate(self, queue, data):
+        levels = {}
+        for updates in (*queue, data):
+            for update in updates:
+                levels[update.type, update.price] = update
+        return list(levels.values())
 
     def __enter__(self):
         ''' Context manager interface
@@ -46,17 +344,33 @@ class OrderBookSubscription:
         self.close()
 
 
-class TickSubscription:
+class TickSubscription(_Subscription):
     ''' An active subscription to a market feed
 
+    When queued, the aggregator may be ahead of the ticks given to the callback.
+    Conflation keeps the latest tick only.
+
     :ivar data: an Aggregator instance with buffered data for the feed. `None` if the subscription
                 is tick-based.
     :vartype data: ~cryptomate.market.aggregator.Aggregator or None
+    :ivar description: the :class:`~cryptomate.market.data.FeedDescription` subscribed to.
+    :ivar int lag: number of events waiting for the callback.
+    :ivar int max_lag: highest lag so far.
+    :ivar int dropped: number of events discarded or conflated on queue overflow.
+    :ivar bool closed: whether the subscription was closed, by the subscriber, the engine,
+                       or for falling behind.
     '''
+    __slots__ = ('data',)
+    event = FeedEvent.TICK
 
-    def close(self):
-        ''' Cancel the subscription '''
-        raise NotImplementedError
+    def __init__(self, engine, description, callback, data, *, queue_size=None,
+                 overflow=OverflowPolicy.DROP_OLDEST, on_disconnect=None):
+        super().__init__(engine, description, callback, queue_size=queue_size,
+                         overflow=overflow, on_disconnect=on_disconnect)
+        self.data = data
+
+    def _conflate(self, queue, data):
+        return data
 
     def __enter__(self):
         ''' Context manager interface
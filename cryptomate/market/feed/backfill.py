@@ -0,0 +1,50 @@
+from abc import ABC, abstractmethod
+from cryptomate.market.data import FeedDescription
+
+
+class TickSource(ABC):
+    ''' Provider of past ticks, for feeds to fill gaps in their event streams.
+
+    Feeds detect gaps from tick identifiers, which must increase by one between
+    consecutive ticks of a symbol.
+    '''
+
+    __slots__ = ()
+
+    @abstractmethod
+    async def read_ticks(self, symbol, after, before):
+        ''' Read ticks missed between two received ticks.
+
+        :param str symbol: market symbol.
+        :param ~cryptomate.market.data.Tick after: last tick received before the gap.
+        :param ~cryptomate.market.data.Tick before: first tick received after the gap.
+        :return: ticks whose identifiers are strictly between those of ``after`` and
+                 ``before``, in order. May be incomplete if the source lacks some.
+        :rtype: ~collections.abc.Sequence(Tick)
+        '''
+        raise NotImplementedError
+
+    async def close(self):
+        ''' Release resources held by the source '''
+
+
+class HistoryTickSource(TickSource):
+    ''' Fill gaps from market history, such as a recording made by another process.
+
+    :param history: history to read ticks from.
+    :type history: ~cryptomate.history.base.History
+    :param str name: feed name in history descriptions.
+    '''
+
+    __slots__ = ('history', 'name')
+
+    def __init__(self, history, name):
+        self.history = history
+        self.name = name
+
+    async def read_ticks(self, symbol, after, before):
+        reader = await self.history.get_reader(FeedDescription(self.name, symbol, None))
+        if not reader.has_ticks:
+            return []
+        ticks = await reader.read_ticks(after.timestamp, before.timestamp + 1)
+        return [tick for tick in ticks if after.id < tick.id < before.id]
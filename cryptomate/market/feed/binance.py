@@ -2,72 +2,164 @@ import aiohttp
 import asyncio
 import logging
 from decimal import Decimal
+from cryptomate.instrumentation import clock, default_instruments
 from cryptomate.market.data import Tick
-from cryptomate.market.feed import Feed
+from cryptomate.market.feed import Feed, FeedEvent, register
+from cryptomate.market.feed.backfill import TickSource
 from cryptomate.util.worker import worker
 
 logger = logging.getLogger(__name__)
 
+try:
+    current_task = asyncio.current_task
+except AttributeError:  # python < 3.7
+    current_task = asyncio.Task.current_task
 
+
+@register
 class BinanceFeed(Feed):
+    ''' Market feed for the Binance exchange, using its combined websocket stream.
+
+    :cvar str WS_URL: template of websocket endpoint, with a ``{streams}`` placeholder.
+    :param session: HTTP session to open connections with. A private session is created
+                    if `None`.
+    :type session: aiohttp.ClientSession or None
+    :param str ws_url: override of :attr:`WS_URL`, for instance to connect to a
+                       :class:`~cryptomate.benchmark.replay.ReplayServer`.
+    :param backfill: where to fetch ticks missed while disconnected. Live ticks of a symbol
+                     are held back until its gap is filled. Gaps are only reported to
+                     :attr:`on_error` if `None`.
+    :type backfill: ~cryptomate.market.feed.backfill.TickSource or None
+    :param int max_backfill: number of missed ticks above which a gap is reported
+                             instead of filled.
+    '''
     name = 'binance'
     WS_URL = 'wss://stream.binance.com:9443/stream?streams={streams}'
 
-    def __init__(self, callback, session=None):
-        super().__init__(callback)
-        if session:
-            self._session, self._own_session = session, False
-        else:
-            self._session, self._own_session = aiohttp.ClientSession(), True
-        self._streams = {}          # idstring => description
+    def __init__(self, *, callback, on_error, session=None, ws_url=None, backfill=None,
+                 max_backfill=10000):
+        super().__init__(callback=callback, on_error=on_error)
+        self._session, self._own_session = session, session is None
+        self.ws_url = ws_url or self.WS_URL
+        self.backfill = backfill
+        self.max_backfill = max_backfill
+        self._streams = {}          # idstring => symbol
+        self._last = {}             # symbol => last tick delivered
+        self._held = {}             # symbol => live ticks held back while filling a gap
+        self._backfills = set()     # running backfill tasks
         self._starting_task = None  # worker in startup phase
         self._task = None           # worker in running phase
         self._started = None        # future that resolves when worker completes startup
         self._close_task = None     # shutdown task
 
-    @classmethod
-    def create(cls, description, callback):
-        return cls(callback)
-
     def close(self):
         if self._starting_task:
             self._starting_task.cancel()
         if self._task and not self._task.done():
             self._task.cancel()
+        for task in self._backfills:
+            task.cancel()
         if self._session and self._own_session:
             self._close_task = asyncio.ensure_future(self._session.close())
 
     async def wait_closed(self):
-        if self._task:
-            await self._task
+        for task in (self._starting_task, self._task, *self._backfills):
+            if task:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         if self._close_task:
             await self._close_task
 
-    @worker(restart=1, restart_on_exception=15)
+    def _report_restart(self, *, exc=None, retry=None):
+        for symbol in set(self._streams.values()):
+            self.on_error(self, symbol, FeedEvent.TICK, exc=exc, retry=retry,
+                          msg=None if exc else 'connection closed')
+
+    @worker(restart=1, restart_on_exception=2, max_delay=120, report=_report_restart)
     async def _worker(self):
-        url = self.WS_URL.format(streams='/'.join(self._streams.keys()))
+        url = self.ws_url.format(streams='/'.join(self._streams.keys()))
         logger.info('connecting to <%s>' % url)
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
 
         async with self._session.ws_connect(url, heartbeat=60) as ws:
-            if asyncio.Task.current_task() == self._starting_task:
+            if current_task() == self._starting_task:
                 if self._task and not self._task.done():
                     self._task.cancel()
                 self._started.set_result(None)
                 self._starting_task, self._task = None, self._starting_task
             async for message in ws:
                 if message.type == aiohttp.WSMsgType.TEXT:
-                    self._process(message.json())
+                    received = clock()
+                    self._process(message.json(), received)
 
-    def _process(self, data):
+    def _process(self, data, received):
         stream, data = data['stream'], data['data']
-
-        self.callback(self._streams[stream], Tick(
+        symbol = self._streams[stream]
+        tick = Tick(
             id=data['t'],
-            timestamp=data['E'],
+            timestamp=data['T'] // 1000,    # trade time, in milliseconds
             type='sell' if data['m'] else 'buy',
             amount=Decimal(data['q']),
             price=Decimal(data['p']),
-        ))
+        )
+
+        start = clock()
+        self._deliver(symbol, tick)
+        end = clock()
+        default_instruments.record('feed.parse', symbol, start - received)
+        default_instruments.record('feed.callback', symbol, end - start)
+
+    def _deliver(self, symbol, tick):
+        ''' Invoke callback with a live tick, unless it is a duplicate or follows a gap '''
+        held = self._held.get(symbol)
+        if held is not None:
+            held.append(tick)
+            return
+        last = self._last.get(symbol)
+        if last is not None:
+            if tick.id <= last.id:
+                return      # already delivered, before a reconnection
+            if tick.id > last.id + 1:
+                self._held[symbol] = [tick]
+                task = asyncio.ensure_future(self._fill(symbol, last, tick))
+                self._backfills.add(task)
+                task.add_done_callback(self._backfills.discard)
+                return
+        self._last[symbol] = tick
+        self.callback(self, symbol, FeedEvent.TICK, tick)
+
+    async def _fill(self, symbol, after, before):
+        ''' Deliver ticks missing between two ticks, then live ticks held back meanwhile '''
+        missing = before.id - after.id - 1
+        ticks, exc = (), None
+        if self.backfill is not None and missing <= self.max_backfill:
+            try:
+                ticks = await self.backfill.read_ticks(symbol, after, before)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                exc = error
+
+        if symbol not in self._held:
+            return      # stream disabled meanwhile
+        last, filled = after, 0
+        for tick in ticks:
+            if last.id < tick.id < before.id:
+                last, filled = tick, filled + 1
+                self.callback(self, symbol, FeedEvent.TICK, tick)
+        if filled < missing:
+            self.on_error(self, symbol, FeedEvent.TICK, exc=exc,
+                          msg='lost %d ticks between %d and %d'
+                              % (missing - filled, after.id, before.id))
+
+        held = self._held.pop(symbol)    # starts with before
+        self._last[symbol] = before
+        self.callback(self, symbol, FeedEvent.TICK, before)
+        for tick in held[1:]:
+            self._deliver(symbol, tick)
 
     def _restart_worker(self):
         if self._starting_task:
@@ -77,17 +169,80 @@ class BinanceFeed(Feed):
         if self._streams:
             self._starting_task = asyncio.ensure_future(self._worker())
         else:
-            self._task.cancel()
+            self._starting_task = None
+            if self._task:
+                self._task.cancel()
             self._started.set_result(None)
 
-    async def enable(self, description):
-        stream = '{description.symbol}@trade'.format(description=description)
-        self._streams[stream] = description
+    @staticmethod
+    def _stream_name(symbol, event):
+        if event is not FeedEvent.TICK:
+            raise ValueError('binance feed does not support %s events' % event.name.lower())
+        return '%s@trade' % symbol.lower()
+
+    async def enable(self, symbol, event):
+        stream = self._stream_name(symbol, event)
+        if stream in self._streams:
+            raise ValueError('%s [%s] is already enabled' % (symbol, event.name.lower()))
+        self._streams[stream] = symbol
         self._restart_worker()
         await self._started
 
-    async def disable(self, description):
-        stream = '{description.symbol}@trade'.format(description=description)
+    async def disable(self, symbol, event):
+        stream = self._stream_name(symbol, event)
         del self._streams[stream]
+        self._last.pop(symbol, None)
+        self._held.pop(symbol, None)
         self._restart_worker()
         await self._started
+
+
+class BinanceTickSource(TickSource):
+    ''' Fill gaps of :class:`BinanceFeed` from the Binance REST API.
+
+    :cvar str REST_URL: base URL of REST API.
+    :param session: HTTP session to send requests with. A private session is created
+                    if `None`.
+    :type session: aiohttp.ClientSession or None
+    :param str api_key: key sent with requests, if the endpoint requires one.
+    :param str rest_url: override of :attr:`REST_URL`.
+    '''
+    REST_URL = 'https://api.binance.com'
+    LIMIT = 1000    #: maximum number of trades per request
+
+    __slots__ = ('session', 'api_key', 'rest_url', '_own_session')
+
+    def __init__(self, *, session=None, api_key=None, rest_url=None):
+        self.session, self._own_session = session, session is None
+        self.api_key = api_key
+        self.rest_url = rest_url or self.REST_URL
+
+    async def read_ticks(self, symbol, after, before):
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        headers = {'X-MBX-APIKEY': self.api_key} if self.api_key else {}
+        ticks = []
+        start = after.id + 1
+        while start < before.id:
+            params = {'symbol': symbol.upper(), 'fromId': start,
+                      'limit': min(self.LIMIT, before.id - start)}
+            async with self.session.get(self.rest_url + '/api/v3/historicalTrades',
+                                        params=params, headers=headers) as response:
+                response.raise_for_status()
+                trades = await response.json()
+            if not trades:
+                break
+            ticks.extend(Tick(
+                id=trade['id'],
+                timestamp=trade['time'] // 1000,
+                type='sell' if trade['isBuyerMaker'] else 'buy',
+                amount=Decimal(trade['qty']),
+                price=Decimal(trade['price']),
+            ) for trade in trades if trade['id'] < before.id)
+            start = trades[-1]['id'] + 1
+        return ticks
+
+    async def close(self):
+        ''' Release the HTTP session, if created by the source '''
+        if self.session is not None and self._own_session:
+            await self.session.close()
@@ -21,7 +21,7 @@ class Factory:
         self._classes[feed.name] = feed
         return feed
 
-    def create(self, description, *, callback, on_error):
+    def create(self, description, *, callback, on_error, **options):
         ''' Instantiate a feed from a description
 
         :param description: describes the feed to instantiate.
@@ -30,6 +30,8 @@ class Factory:
                                   Has form ``callback(feed, symbol, event, data)``
         :param callable on_error: invoked when an enabled event stream gets an error condition.
                                   Has form ``on_error(feed, symbol, event, exc=None, retry, msg)``
+        :param options: additional arguments for the feed class, such as ``backfill`` for
+                        :class:`~cryptomate.market.feed.binance.BinanceFeed`.
         :return: a feed instance than can handle the described feed.
         :rtype: ~cryptomate.market.feed.base.Feed
         '''
@@ -40,7 +42,7 @@ class Factory:
             klass = self._classes[description.name]
         except KeyError:
             raise ValueError('no feed with name %s' % description.name)
-        return klass(callback=callback, on_error=on_error)
+        return klass(callback=callback, on_error=on_error, **options)
 
 default_factory = Factory()
 register = default_factory.register
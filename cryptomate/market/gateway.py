@@ -0,0 +1,348 @@
+''' Multi-process deployment: one gateway process owns the feeds and publishes their
+events into shared memory rings, strategy processes subscribe through a
+:class:`RemoteEngine`, which exposes the same interface as
+:class:`~cryptomate.market.engine.Engine`.
+
+Ring messages are pickled, so gateway and strategy processes must trust each other.
+Ring files and control socket are only accessible to the user running the gateway.
+'''
+import asyncio
+import json
+import logging
+import os
+import pickle
+import signal
+import tempfile
+from itertools import count
+from cryptomate.market.data import FeedDescription, OrderUpdate
+from cryptomate.market.engine import Engine
+from cryptomate.market.feed import FeedEvent
+from cryptomate.util.ring import RingReader, RingWriter
+
+logger = logging.getLogger(__name__)
+
+_ring_ids = count()
+
+
+def _default_directory():
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class Gateway:
+    ''' Publishes market events of an engine to other processes.
+
+    Strategy processes send subscription requests over a unix socket. For each subscribed
+    event stream, the gateway subscribes to its engine and writes events received during
+    an event loop iteration as a single batch into a ring dedicated to that stream.
+
+    :param str address: path of control socket.
+    :param engine: engine owning the feeds. A new engine using the default factory if `None`.
+    :type engine: ~cryptomate.market.engine.Engine
+    :param str directory: where to create ring files. Defaults to ``/dev/shm``.
+    :param int capacity: size of each ring in bytes.
+    '''
+
+    def __init__(self, address, *, engine=None, directory=None, capacity=1 << 24):
+        self.address = address
+        self.engine = engine or Engine()
+        self.directory = directory or _default_directory()
+        self.capacity = capacity
+        self._streams = {}          # (name, symbol, event) => _Stream
+        self._pending = {}          # (name, symbol, event) => future resolved once opened
+        self._server = None
+        self._clients = set()
+
+    async def start(self):
+        ''' Start accepting strategy processes '''
+        old_umask = os.umask(0o077)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle, self.address)
+        finally:
+            os.umask(old_umask)
+
+    def close(self):
+        ''' Stop accepting strategy processes and release all streams '''
+        if self._server:
+            self._server.close()
+        for writer in self._clients:
+            writer.close()
+        for pending in self._pending.values():
+            pending.cancel()
+        for stream in self._streams.values():
+            stream.close()
+        self._streams.clear()
+
+    async def wait_closed(self):
+        ''' Wait until gateway is completely shutdown.
+            Only valid after :meth:`close` has been called.
+        '''
+        if self._server:
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        self._clients.add(writer)
+        owned = []          # stream keys subscribed to by this client
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line.decode())
+                    key = (request['name'], request['symbol'], FeedEvent[request['event']])
+                    if request['op'] == 'subscribe':
+                        response = await self._subscribe(key)
+                        owned.append(key)
+                    elif request['op'] == 'unsubscribe':
+                        owned.remove(key)
+                        self._unsubscribe(key)
+                        response = {}
+                    else:
+                        raise ValueError('unknown operation %s' % request['op'])
+                except Exception as exc:
+                    response = {'error': '%s: %s' % (exc.__class__.__name__, exc)}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            for key in owned:
+                self._unsubscribe(key)
+            writer.close()
+
+    async def _subscribe(self, key):
+        stream = self._streams.get(key)
+        while stream is None:
+            # concurrent subscribers share a single setup, and all fail if it fails
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = asyncio.ensure_future(self._open(key))
+                pending.add_done_callback(lambda _: self._pending.pop(key, None))
+            await asyncio.shield(pending)
+            stream = self._streams.get(key)     # may have been released meanwhile
+
+        stream.count += 1
+        stream.flush()
+        position = stream.ring.head
+        if key[2] is FeedEvent.ORDERBOOK:
+            stream.snapshot()
+        return {'path': stream.ring.path, 'position': position}
+
+    async def _open(self, key):
+        ''' Create the ring of a stream and subscribe to its events '''
+        path = os.path.join(self.directory, 'cryptomate-%d-%d.ring'
+                            % (os.getpid(), next(_ring_ids)))
+        stream = _Stream(RingWriter(path, self.capacity))
+        try:
+            description = FeedDescription(key[0], key[1], None)
+            if key[2] is FeedEvent.TICK:
+                stream.subscription = await self.engine.subscribe_ticks(
+                    description, stream.on_ticks)
+            else:
+                stream.subscription = await self.engine.subscribe_orderbook(
+                    description, stream.on_updates)
+        except BaseException:
+            stream.close()
+            raise
+        self._streams[key] = stream
+
+    def _unsubscribe(self, key):
+        stream = self._streams[key]
+        stream.count -= 1
+        if not stream.count:
+            del self._streams[key]
+            stream.close()
+
+
+class _Stream:
+    ''' Publication state of a single event stream '''
+    __slots__ = ('ring', 'subscription', 'count', '_pending', '_scheduled')
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.subscription = None
+        self.count = 0
+        self._pending = []
+        self._scheduled = False
+
+    def on_ticks(self, description, tick):
+        self._pending.append(tick)
+        self._schedule()
+
+    def on_updates(self, description, updates):
+        self._pending.extend(updates)
+        self._schedule()
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_event_loop().call_soon(self.flush)
+
+    def flush(self):
+        self._scheduled = False
+        if self._pending and self.ring is not None:
+            self.ring.write(pickle.dumps((False, self._pending), pickle.HIGHEST_PROTOCOL))
+        self._pending = []
+
+    def snapshot(self):
+        book = self.subscription.order_book
+        updates = ([OrderUpdate(None, None, 'buy', amount, price) for price, amount in book.bids()]
+                   + [OrderUpdate(None, None, 'sell', amount, price)
+                      for price, amount in book.asks()])
+        self.ring.write(pickle.dumps((True, updates), pickle.HIGHEST_PROTOCOL))
+
+    def close(self):
+        if self.subscription:
+            self.subscription.close()
+        self.ring.close()
+        self.ring = None
+
+
+class RemoteEngine(Engine):
+    ''' Engine receiving market events from a :class:`Gateway` in another process.
+
+    Exposes the same subscription interface as :class:`~cryptomate.market.engine.Engine`,
+    without opening any exchange connection. Rings are polled from the event loop.
+
+    :param str address: path of gateway control socket.
+    :param float poll_interval: delay in seconds between two polls when rings are idle.
+    '''
+
+    def __init__(self, address, *, poll_interval=0.001):
+        super().__init__()
+        self.address = address
+        self.poll_interval = poll_interval
+        self._readers = {}          # (name, symbol, event) => RingReader
+        self._connection = None     # (reader, writer) to gateway
+        self._lock = asyncio.Lock()
+        self._poller = None
+        self._resyncs = {}          # (name, symbol, event) => task requesting a snapshot
+
+    def close(self):
+        self._clear()
+        if self._poller:
+            self._poller.cancel()
+        for task in self._resyncs.values():
+            task.cancel()
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+        if self._connection:
+            self._connection[1].close()
+
+    async def wait_closed(self):
+        if self._poller:
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        self._connection = None
+
+    async def _request(self, op, key):
+        async with self._lock:
+            if self._connection is None:
+                self._connection = await asyncio.open_unix_connection(self.address)
+            reader, writer = self._connection
+            writer.write(json.dumps({
+                'op': op, 'name': key[0], 'symbol': key[1], 'event': key[2].name,
+            }).encode() + b'\n')
+            line = await reader.readline()
+        if not line:
+            self._connection = None
+            raise ConnectionError('gateway closed the connection')
+        response = json.loads(line.decode())
+        if 'error' in response:
+            raise ValueError('gateway refused %s: %s' % (op, response['error']))
+        return response
+
+    async def _enable(self, key):
+        response = await self._request('subscribe', key)
+        self._readers[key] = RingReader(response['path'], response['position'])
+        if self._poller is None:
+            self._poller = asyncio.ensure_future(self._poll())
+
+    async def _disable(self, key):
+        reader = self._readers.pop(key, None)
+        if reader is None:
+            return
+        reader.close()
+        try:
+            await self._request('unsubscribe', key)
+        except (ConnectionError, ValueError):
+            logger.exception('failed to unsubscribe from %s %s [%s]',
+                             key[0], key[1], key[2].name.lower())
+
+    async def _resync(self, key):
+        ''' Get a new snapshot of an order book whose updates were lost.
+
+        Subscribing again makes the gateway write a snapshot, the stream is then read from
+        there and the additional subscription released.
+        '''
+        try:
+            response = await self._request('subscribe', key)
+        except (ConnectionError, ValueError):
+            logger.exception('failed to resynchronise %s %s [%s]',
+                             key[0], key[1], key[2].name.lower())
+            return
+        finally:
+            self._resyncs.pop(key, None)
+        reader = self._readers.get(key)
+        if reader is not None:      # unless disabled meanwhile
+            self._readers[key] = RingReader(response['path'], response['position'])
+            reader.close()
+        try:
+            await self._request('unsubscribe', key)
+        except (ConnectionError, ValueError):
+            logger.exception('failed to unsubscribe from %s %s [%s]',
+                             key[0], key[1], key[2].name.lower())
+
+    async def _poll(self):
+        while True:
+            busy = False
+            for key, reader in list(self._readers.items()):
+                lost = reader.lost
+                for message in reader.read():
+                    busy = True
+                    try:
+                        snapshot, items = pickle.loads(message)
+                        if key[2] is FeedEvent.TICK:
+                            self._dispatch_ticks(key, items)
+                        else:
+                            self._dispatch_updates(key, items, snapshot=snapshot)
+                    except Exception:
+                        logger.exception('%s %s [%s]: failed to dispatch events',
+                                         key[0], key[1], key[2].name.lower())
+                if reader.lost != lost:
+                    logger.warning('%s %s [%s]: fell behind, lost %d bytes of events',
+                                   key[0], key[1], key[2].name.lower(), reader.lost - lost)
+                    if key[2] is FeedEvent.ORDERBOOK and key not in self._resyncs:
+                        self._resyncs[key] = asyncio.ensure_future(self._resync(key))
+            await asyncio.sleep(0 if busy else self.poll_interval)
+
+
+def serve(address, **kwargs):
+    ''' Run a gateway until interrupted or terminated.
+
+    Blocks, so it is suitable as the target of a :class:`multiprocessing.Process`.
+
+    :param str address: path of control socket.
+    :param kwargs: additional arguments for :class:`Gateway`.
+    '''
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    gateway = Gateway(address, **kwargs)
+    loop.run_until_complete(gateway.start())
+    loop.add_signal_handler(signal.SIGTERM, loop.stop)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.close()
+        gateway.engine.close()
+        loop.run_until_complete(gateway.wait_closed())
+        loop.run_until_complete(gateway.engine.wait_closed())
+        loop.close()
@@ -1,3 +1,5 @@
+from bisect import bisect_left, insort
+
 
 class OrderBook:
     ''' Instant representation of the order book.
@@ -7,11 +9,64 @@ class OrderBook:
     :ivar sell: Ask side of the order book.
     :vartype sell: ~collections.abc.Mapping(~decimal.Decimal, ~decimal.Decimal)
     '''
+    __slots__ = ('buy', 'sell', '_bids', '_asks')
+
+    def __init__(self):
+        self.buy = {}
+        self.sell = {}
+        self._bids = []     # sorted prices of buy side
+        self._asks = []     # sorted prices of sell side
 
     def update(self, updates):
         ''' Update the data in the order book.
 
+        An update with a zero amount removes the price level.
+
         :var updates: A collection of updates to perform.
         :vartype updates: ~collections.abc.Collection(~cryptomate.market.data.OrderUpdate)
         '''
-        raise NotImplementedError
+        for update in updates:
+            if update.type == 'buy':
+                levels, prices = self.buy, self._bids
+            else:
+                levels, prices = self.sell, self._asks
+            price = update.price
+            if update.amount:
+                if price not in levels:
+                    insort(prices, price)
+                levels[price] = update.amount
+            elif price in levels:
+                del levels[price]
+                del prices[bisect_left(prices, price)]
+
+    def clear(self):
+        ''' Remove all price levels '''
+        self.buy.clear()
+        self.sell.clear()
+        del self._bids[:], self._asks[:]
+
+    @property
+    def best_bid(self):
+        ''' Highest buy price, or `None` if there are no bids. '''
+        return self._bids[-1] if self._bids else None
+
+    @property
+    def best_ask(self):
+        ''' Lowest sell price, or `None` if there are no asks. '''
+        return self._asks[0] if self._asks else None
+
+    def bids(self):
+        ''' Iterate over buy side levels, best first.
+
+        :rtype: ~collections.abc.Iterator(tuple(~decimal.Decimal, ~decimal.Decimal))
+        '''
+        buy = self.buy
+        return ((price, buy[price]) for price in reversed(self._bids))
+
+    def asks(self):
+        ''' Iterate over sell side levels, best first.
+
+        :rtype: ~collections.abc.Iterator(tuple(~decimal.Decimal, ~decimal.Decimal))
+        '''
+        sell = self.sell
+        return ((price, sell[price]) for price in self._asks)
@@ -1,3 +1,7 @@
-from cryptomate.notification.base import Notifier
+from cryptomate.notification.base import Destination, Notifier
+from cryptomate.notification.queue import Notification, Overflow, QueuedNotifier
 
-__all__ = ('Notifier',)
+__all__ = (
+    'Destination', 'Notifier',
+    'Notification', 'Overflow', 'QueuedNotifier',
+)
@@ -12,3 +12,17 @@ class Notifier(ABC):
         The notification is sent asynchronously.
         """
         raise NotImplementedError
+
+
+class Destination(ABC):
+    ''' Endpoint notifications are delivered to, such as a file or a web service.
+    '''
+
+    @abstractmethod
+    async def send(self, notifications):
+        ''' Deliver a batch of notifications.
+
+        :param notifications: Notifications to deliver, oldest first.
+        :paramtype notifications: ~collections.abc.Sequence(Notification)
+        '''
+        raise NotImplementedError
@@ -0,0 +1,31 @@
+import asyncio
+import json
+from cryptomate.notification.base import Destination
+
+
+class FileDestination(Destination):
+    ''' Appends notifications to a file, one JSON object per line.
+
+    Writing happens in the default executor, so a slow disk does not stall the event loop.
+
+    :param str path: path of file to append notifications to.
+    '''
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+
+    async def send(self, notifications):
+        lines = ''.join(json.dumps({
+            'timestamp': notification.timestamp,
+            'suppressed': notification.suppressed,
+            'data': notification.data,
+        }, default=str) + '\n' for notification in notifications)
+        await asyncio.get_event_loop().run_in_executor(None, self._write, lines)
+
+    def _write(self, lines):
+        with open(self.path, 'a', encoding='utf-8') as fd:
+            fd.write(lines)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
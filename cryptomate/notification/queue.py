@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import time
+from collections import deque, namedtuple
+from enum import Enum, auto
+from cryptomate.notification.base import Notifier
+
+logger = logging.getLogger(__name__)
+
+Notification = namedtuple('Notification', 'timestamp data suppressed', module=__name__)
+Notification.__doc__ = ''' A single notification, as handed to destinations.
+
+:param float timestamp: Number of seconds between the Epoch and the time it was posted.
+:param dict data: Keyword arguments the notification was posted with.
+:param int suppressed: Number of identical notifications that were deduplicated since this
+                       one was last sent.
+'''
+
+
+class Overflow(Enum):
+    DROP = auto()       #: silently discard notifications that do not fit in the queue
+    SUMMARISE = auto()  #: discard them, then send a notification telling how many were lost
+
+
+class QueuedNotifier(Notifier):
+    ''' Notifier that delivers notifications in batches from background tasks.
+
+    Posting never blocks: notifications are queued for every destination, and one task per
+    destination sends them in batches, so a slow destination delays neither the caller nor
+    the other destinations. Identical notifications are sent at most once per ``window``; the
+    number of duplicates suppressed is reported with the next one sent, or as soon as the
+    window expires.
+
+    Must be used from within a running event loop.
+
+    :param destinations: where notifications are delivered.
+    :paramtype destinations: ~collections.abc.Iterable(~cryptomate.notification.base.Destination)
+    :param int queue_size: maximum number of notifications pending for each destination.
+    :param int batch_size: maximum number of notifications delivered in a single batch.
+    :param float interval: minimum delay in seconds between two batches to a destination.
+    :param float window: deduplication window in seconds. `0` disables deduplication.
+    :param Overflow overflow: what to do with notifications that do not fit in the queue.
+    '''
+    __slots__ = ('_channels', '_batch_size', '_interval', '_window', '_overflow',
+                 '_recent', '_pruned', '_timer', '_closing')
+
+    def __init__(self, destinations, *, queue_size=1000, batch_size=100, interval=1,
+                 window=60, overflow=Overflow.SUMMARISE):
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError('queue_size and batch_size must be positive')
+        if not isinstance(overflow, Overflow):
+            raise TypeError('overflow must be an Overflow, not %s' % overflow.__class__.__name__)
+        self._channels = tuple(_Channel(destination, queue_size) for destination in destinations)
+        self._batch_size = batch_size
+        self._interval = interval
+        self._window = window
+        self._overflow = overflow
+        self._recent = {}           # key => [last sent, suppressed count, data]
+        self._pruned = time.monotonic()
+        self._timer = None          # handle of next expiry of suppressed duplicates
+        self._closing = False
+
+    @property
+    def dropped(self):
+        ''' Total number of notifications lost to queue overflow so far. '''
+        return sum(channel.total_dropped for channel in self._channels)
+
+    def post(self, **kwargs):
+        ''' Send a single notification.
+
+        The notification is queued for all destinations and sent asynchronously.
+        '''
+        if self._closing:
+            raise RuntimeError('notifier is closed')
+        suppressed = 0
+        if self._window:
+            now = time.monotonic()
+            if now - self._pruned >= self._window:
+                self._prune(now)
+            key = _make_key(kwargs)
+            entry = self._recent.get(key)
+            if entry is not None:
+                if now - entry[0] < self._window:
+                    entry[1] += 1
+                    if entry[1] == 1:
+                        self._schedule_expiry(entry[0] + self._window - now)
+                    return
+                suppressed = entry[1]
+            self._recent[key] = [now, 0, kwargs]
+        self._enqueue(Notification(time.time(), kwargs, suppressed))
+
+    def close(self):
+        ''' Request notifier shutdown. Already queued notifications are still delivered. '''
+        if self._closing:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._prune(None)
+        self._closing = True
+        for channel in self._channels:
+            channel.wakeup.set()
+
+    async def wait_closed(self):
+        ''' Wait until all queued notifications have been delivered.
+            Only valid after :meth:`close` has been called.
+        '''
+        tasks = [channel.task for channel in self._channels if channel.task]
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def _enqueue(self, notification):
+        for channel in self._channels:
+            if len(channel.queue) < channel.queue.maxlen:
+                channel.queue.append(notification)
+            else:
+                channel.dropped += 1
+                channel.total_dropped += 1
+            channel.wakeup.set()
+            if channel.task is None:
+                channel.task = asyncio.ensure_future(self._deliver(channel))
+
+    def _prune(self, now):
+        ''' Forget notifications whose window expired, reporting suppressed duplicates.
+            If now is `None`, all notifications are considered expired.
+        '''
+        expired = [key for key, entry in self._recent.items()
+                   if now is None or now - entry[0] >= self._window]
+        for key in expired:
+            _, suppressed, data = self._recent.pop(key)
+            if suppressed:
+                self._enqueue(Notification(time.time(), data, suppressed))
+        self._pruned = now
+
+    def _schedule_expiry(self, delay):
+        ''' Make sure suppressed duplicates get reported within delay seconds '''
+        loop = asyncio.get_event_loop()
+        if self._timer is not None:
+            if self._timer.when() <= loop.time() + delay:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._expire)
+
+    def _expire(self):
+        self._timer = None
+        now = time.monotonic()
+        self._prune(now)
+        pending = [entry[0] for entry in self._recent.values() if entry[1]]
+        if pending:
+            self._schedule_expiry(min(pending) + self._window - now)
+
+    async def _deliver(self, channel):
+        queue = channel.queue
+        while True:
+            await channel.wakeup.wait()
+            channel.wakeup.clear()
+
+            while queue or channel.dropped:
+                batch = [queue.popleft() for _ in range(min(self._batch_size, len(queue)))]
+                if channel.dropped:
+                    if self._overflow is Overflow.SUMMARISE:
+                        batch.append(Notification(time.time(), {'dropped': channel.dropped}, 0))
+                    channel.dropped = 0
+                if not batch:
+                    continue
+                try:
+                    await channel.destination.send(batch)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception('failed to deliver %d notifications to %r',
+                                     len(batch), channel.destination)
+                if self._interval:
+                    await asyncio.sleep(self._interval)
+
+            if self._closing:
+                return
+
+
+class _Channel:
+    ''' Delivery state for a single destination '''
+    __slots__ = ('destination', 'queue', 'dropped', 'total_dropped', 'wakeup', 'task')
+
+    def __init__(self, destination, queue_size):
+        self.destination = destination
+        self.queue = deque(maxlen=queue_size)
+        self.dropped = 0            # dropped since last batch
+        self.total_dropped = 0
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+
+def _make_key(data):
+    ''' Build a hashable key identifying identical notifications '''
+    try:
+        key = frozenset(data.items())
+        hash(key)
+    except TypeError:
+        key = repr(sorted(data.items()))
+    return key
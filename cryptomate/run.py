@@ -1,16 +1,260 @@
-""" Entry points for cryptomate deployments """
+""" Entry points for cryptomate deployments
+
+Only the command-line parser is loaded at startup: each command imports what it
+needs when it runs, so short-lived commands and worker processes start quickly.
+"""
 
 import argparse
 import sys
 
+#: Modules registering feeds with the default factory, by feed name.
+FEED_MODULES = {
+    'binance': 'cryptomate.market.feed.binance',
+    'synthetic': 'cryptomate.benchmark.synthetic',
+}
+
+#: Sources able to fill tick gaps of a feed, as module:callable, by feed name.
+BACKFILL_SOURCES = {
+    'binance': 'cryptomate.market.feed.binance:BinanceTickSource',
+}
+
 
 def parse_arguments(args=None):
     ''' Convert command-line arguments into usable options '''
-    parser = argparse.ArgumentParser()
-    return parser.parse_args(args)
+    parser = argparse.ArgumentParser(prog='cryptomate')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    record = commands.add_parser('record', help='record market feeds into history')
+    record.add_argument('history', help='history directory')
+    record.add_argument('symbols', nargs='+', metavar='symbol', help='market symbol')
+    record.add_argument('-f', '--feed', default='binance', help='feed name')
+    record.add_argument('-b', '--orderbook', action='store_true',
+                        help='record order book updates as well as ticks')
+    record.add_argument('-d', '--duration', type=float,
+                        help='stop after this many seconds, instead of waiting for a signal')
+    record.add_argument('--flush', type=float, default=5,
+                        help='delay in seconds between two history flushes')
+    record.add_argument('--backfill', action='store_true',
+                        help='fill tick gaps after reconnections from the platform API')
+    record.add_argument('-O', '--feed-option', dest='feed_options', action='append',
+                        type=_feed_option, default=[], metavar='NAME=VALUE',
+                        help='additional feed argument, such as ws_url=ws://localhost:8000/'
+                             'stream?streams={streams}. Values are parsed as Python literals '
+                             'when possible')
+    record.add_argument('--audit', metavar='DIRECTORY',
+                        help='journal feed reconnections and subscriptions into this directory')
+    record.set_defaults(handler=_record)
+
+    backtest = commands.add_parser('backtest', aliases=['replay'],
+                                   help='run a strategy over market history')
+    backtest.add_argument('history', help='history directory')
+    backtest.add_argument('symbol', help='market symbol')
+    backtest.add_argument('strategy', help='strategy factory, as module:callable. Invoked as '
+                          'factory(description, aggregator), it returns the tick callback')
+    backtest.add_argument('-f', '--feed', default='binance', help='feed name')
+    backtest.add_argument('-p', '--period', type=int,
+                          help='aggregation timeframe in seconds, for candle-based strategies')
+    backtest.add_argument('--start', type=int, default=0, help='first timestamp (inclusive)')
+    backtest.add_argument('--stop', type=int, default=2 ** 63,
+                          help='last timestamp (exclusive)')
+    backtest.set_defaults(handler=_backtest)
+
+    # benchmark options are parsed by the benchmark module, only loaded when needed
+    bench = commands.add_parser('bench', add_help=False, help='run performance benchmarks')
+    bench.set_defaults(handler=_bench)
+
+    options, remaining = parser.parse_known_args(args)
+    if options.command == 'bench':
+        options.arguments = remaining
+    elif remaining:
+        parser.error('unrecognized arguments: %s' % ' '.join(remaining))
+    return options
 
 
 def main(args=None):
     ''' Entry point, installed as cli command '''
     options = parse_arguments(args=args)
+    return options.handler(options)
+
+
+def load_feed(name):
+    ''' Import the module providing a feed, so it registers with the default factory '''
+    import importlib
+    module = FEED_MODULES.get(name)
+    if module:
+        importlib.import_module(module)
+
+
+def load_strategy(spec):
+    ''' Resolve a ``module:callable`` strategy specification '''
+    return _load_object(spec, 'strategy')
+
+
+def _load_object(spec, kind):
+    import importlib
+    module, _, attribute = spec.partition(':')
+    if not attribute:
+        raise ValueError('%s must be given as module:callable, not %s' % (kind, spec))
+    return getattr(importlib.import_module(module), attribute)
+
+
+def _feed_option(text):
+    import ast
+    name, sep, value = text.partition('=')
+    if not sep or not name.isidentifier():
+        raise argparse.ArgumentTypeError('expected NAME=VALUE, not %s' % text)
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+
+def _run_async(coroutine):
+    import asyncio
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+# Commands
+
+def _record(options):
+    load_feed(options.feed)
+    from cryptomate.history import FileHistory
+    from cryptomate.market import Engine
+
+    feed_options = dict(options.feed_options)
+    source = None
+    if options.backfill:
+        if options.feed not in BACKFILL_SOURCES:
+            print('no backfill source for feed %s' % options.feed, file=sys.stderr)
+            return 2
+        source = _load_object(BACKFILL_SOURCES[options.feed], 'backfill source')()
+        feed_options['backfill'] = source
+
+    async def run():
+        journal = None
+        if options.audit:
+            from cryptomate.auditing import Journal
+            journal = Journal(directory=options.audit)
+            journal.start()
+        engine = Engine(feed_options={options.feed: feed_options}, journal=journal)
+        try:
+            return await record(options, engine, FileHistory(options.history))
+        finally:
+            if source is not None:
+                await source.close()
+            if journal is not None:
+                journal.close()
+                await journal.wait_closed()
+    return _run_async(run())
+
+
+async def record(options, engine, history):
+    ''' Stream feed events into history until interrupted or duration elapsed '''
+    import asyncio
+    import signal
+    from cryptomate.market import FeedDescription
+
+    loop = asyncio.get_event_loop()
+    done = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, done.set)
+    if options.duration is not None:
+        loop.call_later(options.duration, done.set)
+
+    recorders, subscriptions = [], []
+    try:
+        for symbol in options.symbols:
+            description = FeedDescription(options.feed, symbol, None)
+            recorder = _Recorder(await history.get_writer(description))
+            recorders.append(recorder)
+            subscriptions.append(await engine.subscribe_ticks(description, recorder.on_tick))
+            if options.orderbook:
+                recorder.book = await engine.subscribe_orderbook(description,
+                                                                 recorder.on_updates)
+                subscriptions.append(recorder.book)
+
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(done.wait(), options.flush)
+            except asyncio.TimeoutError:
+                pass
+            for recorder in recorders:
+                await recorder.writer.flush()
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(signum)
+        for subscription in subscriptions:
+            subscription.close()
+        engine.close()
+        await engine.wait_closed()
+        for recorder in recorders:
+            await recorder.writer.flush()
     return 0
+
+
+class _Recorder:
+    ''' Subscription callbacks writing events of a single feed into history '''
+    __slots__ = ('writer', 'book')
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.book = None        # order book subscription, once established
+
+    def on_tick(self, description, tick):
+        self.writer.write_ticks((tick,))
+
+    def on_updates(self, description, updates):
+        if self.book is not None:
+            self.writer.write_order_updates(updates, order_book=self.book.order_book)
+
+
+def _backtest(options):
+    from cryptomate.history import FileHistory
+    try:
+        strategy = load_strategy(options.strategy)
+    except (ImportError, AttributeError, ValueError) as exc:
+        print('cannot load strategy: %s' % exc, file=sys.stderr)
+        return 2
+    return _run_async(backtest(options, FileHistory(options.history), strategy))
+
+
+async def backtest(options, history, strategy):
+    ''' Feed history ticks to a strategy, as a live tick subscription would '''
+    import time
+    from cryptomate.market import FeedDescription
+    from cryptomate.market.aggregator import Aggregator
+
+    description = FeedDescription(options.feed, options.symbol, options.period)
+    reader = await history.get_reader(description)
+    if not reader.has_ticks:
+        print('no tick history for %s %s' % (options.feed, options.symbol), file=sys.stderr)
+        return 1
+
+    ticks = await reader.read_ticks(options.start, options.stop)
+    aggregator = Aggregator(options.period) if options.period else None
+    callback = strategy(description, aggregator)
+
+    start = time.perf_counter()
+    for tick in ticks:
+        if aggregator is not None:
+            aggregator.update((tick,))
+        callback(description, tick)
+    elapsed = time.perf_counter() - start
+
+    print('%d ticks in %.3fs (%.0f ticks/s)' % (len(ticks), elapsed,
+                                                len(ticks) / elapsed if elapsed else 0))
+    return 0
+
+
+def _bench(options):
+    from cryptomate.benchmark import runner
+    import cryptomate.benchmark.suites     # registers benchmarks
+    parser = argparse.ArgumentParser(prog='cryptomate bench',
+                                     description='Run cryptomate performance benchmarks.')
+    runner.add_arguments(parser)
+    return runner.execute(parser.parse_args(options.arguments))
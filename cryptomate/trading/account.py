@@ -1,4 +1,35 @@
+import functools
 from abc import ABC, abstractmethod
+from cryptomate.instrumentation import clock, default_instruments
+
+
+def _instrument_add_order(func):
+    ''' Time and journal an implementation of :meth:`Account.add_order`, per order symbol.
+
+    Only the implementation resolved on the account class records anything, so overrides
+    calling ``super().add_order()`` are counted once, for their whole duration.
+    '''
+    @functools.wraps(func)
+    async def wrapper(self, order, *args, **kwargs):
+        if type(self).add_order is not wrapper:
+            return await func(self, order, *args, **kwargs)
+        symbol, journal = getattr(order, 'symbol', None), self.journal
+        if journal is not None:
+            journal.order_sent(symbol, order)
+        start = clock()
+        try:
+            order_id = await func(self, order, *args, **kwargs)
+        except Exception:
+            if journal is not None:
+                journal.order_ack(symbol, None, 'rejected')
+            raise
+        finally:
+            default_instruments.record('account.add_order', symbol, clock() - start)
+        if journal is not None:
+            journal.order_ack(symbol, order_id, 'accepted')
+        return order_id
+    wrapper.__timed__ = True
+    return wrapper
 
 
 class Account(ABC):
@@ -14,7 +45,23 @@ class Account(ABC):
     :ivar ~decimal.Decimal margin_balance: available margin for trading.
     :ivar ~decimal.Decimal used_margin: margin currently locked as collateral.
     :ivar float margin_level: :attr:`equity` to :attr:`used_margin` ratio.
+    :ivar journal: where orders sent, their acknowledgements and trades are recorded.
+                   Not recorded if `None`, the default.
+    :vartype journal: ~cryptomate.auditing.journal.Journal or None
+
+    Implementations of :meth:`add_order` are timed automatically, as stage
+    ``account.add_order`` of :data:`~cryptomate.instrumentation.default_instruments`,
+    with the symbol of the order. They are journaled automatically too, as accepted if
+    they return and rejected if they raise.
     '''
+    journal = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        add_order = cls.__dict__.get('add_order')
+        if (add_order is not None and not getattr(add_order, '__isabstractmethod__', False)
+                and not getattr(add_order, '__timed__', False)):
+            cls.add_order = _instrument_add_order(add_order)
 
     @abstractmethod
     def close(self):
@@ -28,6 +75,7 @@ class Account(ABC):
         :param Order order: Full description of the order.
         :param options: Additional options (such as post-only). Platform-dependent.
         :paramtype options: dict or None.
+        :return: the identifier the exchange assigned to the order.
         '''
         raise NotImplementedError
 
@@ -36,6 +84,16 @@ class Account(ABC):
         ''' Cancel the order with given id. '''
         raise NotImplementedError
 
+    def add_trade(self, trade):
+        ''' Record a trade generated by an order of this account.
+
+        Implementations must call it for every trade they receive from the exchange.
+
+        :param ~cryptomate.trading.data.Trade trade: the trade.
+        '''
+        if self.journal is not None:
+            self.journal.trade(trade)
+
     @abstractmethod
     def get_rules(self, symbol):
         ''' Get the trading rules for a market.
@@ -50,6 +108,7 @@ class Order:
     ''' Buy/sell intent, currently active on the market.
 
     :ivar timestamp: Number of seconds between the Epoch and order creation.
+    :ivar str symbol: Market symbol. Actual meaning depends on platform.
     :ivar ~Order.type: ``limit`` or ``market``.
     :ivar side: ``buy`` or ``sell``.
     :ivar expiration: Number of seconds between the Epoch and order expiration.
@@ -62,5 +121,5 @@ class Order:
     :vartype trades: ~collections.abc.Sequence(~cryptomate.trading.data.Trade)
     :ivar ~decimal.Decimal executed:
     '''
-    __slots__ = ('timestamp', 'type', 'side', 'expiration', 'amount',
+    __slots__ = ('timestamp', 'symbol', 'type', 'side', 'expiration', 'amount',
                  'price', 'leverage', 'trades', 'executed')
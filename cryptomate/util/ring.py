@@ -0,0 +1,178 @@
+''' Single-producer, multiple-consumer message ring over a shared memory-mapped file.
+
+The writer appends length-prefixed messages and publishes them by advancing the head
+counter in the file header. Readers, possibly in other processes, keep their own cursor
+and never block the writer. As the writer may be overwriting up to half the ring ahead of
+its published head, a reader that falls more than half the ring behind loses messages,
+and is told how many bytes it missed. It resumes at the oldest message still safe to
+read, which the writer publishes along with the head.
+'''
+from collections import deque
+import mmap
+import os
+import struct
+
+MAGIC = b'CMRING01'
+
+#: File header: magic, capacity, head (total bytes ever written), then position of
+#: oldest message within the last half ring.
+HEADER = struct.Struct('<8sQ')
+HEADER_SIZE = 64
+HEAD_OFFSET = 16
+OLDEST_OFFSET = 24
+
+_HEAD = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_PADDING = 0xffffffff
+
+
+class RingWriter:
+    ''' Write end of a ring. There must be exactly one writer per ring.
+
+    :param str path: path of ring file, preferably on a memory-backed filesystem
+                     such as ``/dev/shm``. Created or truncated.
+    :param int capacity: size of data area in bytes.
+    '''
+    __slots__ = ('path', 'capacity', '_fd', '_mmap', '_head', '_starts')
+
+    def __init__(self, path, capacity=1 << 24):
+        if capacity < 64:
+            raise ValueError('capacity must be at least 64 bytes')
+        self.path = path
+        self.capacity = capacity
+        self._head = 0
+        self._starts = deque()      # positions of messages within the last half ring
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(self._fd, HEADER_SIZE + capacity)
+            self._mmap = mmap.mmap(self._fd, HEADER_SIZE + capacity)
+        except Exception:
+            os.close(self._fd)
+            raise
+        HEADER.pack_into(self._mmap, 0, MAGIC, capacity)
+        _HEAD.pack_into(self._mmap, HEAD_OFFSET, 0)
+        _HEAD.pack_into(self._mmap, OLDEST_OFFSET, 0)
+
+    @property
+    def head(self):
+        ''' Position of next message. Readers opened at this position receive all messages
+            written from now on.
+        '''
+        return self._head
+
+    def write(self, payload):
+        ''' Append a message to the ring.
+
+        :param bytes payload: message content. At most half the ring capacity.
+        '''
+        size = _LENGTH.size + len(payload)
+        if size > self.capacity // 2:
+            raise ValueError('message of %d bytes too large for ring' % len(payload))
+
+        mm, head, capacity = self._mmap, self._head, self.capacity
+        offset = head % capacity
+        if capacity - offset < size:
+            if capacity - offset >= _LENGTH.size:
+                _LENGTH.pack_into(mm, HEADER_SIZE + offset, _PADDING)
+            head += capacity - offset
+            offset = 0
+
+        start = HEADER_SIZE + offset
+        mm[start + _LENGTH.size:start + size] = payload
+        _LENGTH.pack_into(mm, start, len(payload))
+        self._head = head + size
+        _HEAD.pack_into(mm, HEAD_OFFSET, self._head)
+
+        # published after head, so readers never see it ahead of the head they read
+        starts = self._starts
+        starts.append(head)
+        limit = self._head - capacity // 2
+        while starts[0] < limit:
+            starts.popleft()
+        _HEAD.pack_into(mm, OLDEST_OFFSET, starts[0])
+
+    def close(self):
+        ''' Release the ring and remove its file '''
+        self._mmap.close()
+        os.close(self._fd)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class RingReader:
+    ''' Read end of a ring.
+
+    :param str path: path of ring file.
+    :param int position: position to start reading from, as given by
+                         :attr:`RingWriter.head`. Defaults to the current head.
+    :ivar int lost: number of bytes overwritten before they could be read.
+    '''
+    __slots__ = ('path', 'capacity', 'lost', '_fd', '_mmap', '_position')
+
+    def __init__(self, path, position=None):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.fstat(self._fd).st_size
+            self._mmap = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        except Exception:
+            os.close(self._fd)
+            raise
+        magic, self.capacity = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or size != HEADER_SIZE + self.capacity:
+            self.close()
+            raise ValueError('%s is not a ring file' % path)
+        self.lost = 0
+        self._position = self._head() if position is None else position
+
+    def _head(self):
+        return _HEAD.unpack_from(self._mmap, HEAD_OFFSET)[0]
+
+    def read(self, limit=None):
+        ''' Read available messages.
+
+        :param int limit: maximum number of messages to return, `None` for no limit.
+        :return: messages in order they were written.
+        :rtype: list(bytes)
+        '''
+        mm, capacity = self._mmap, self.capacity
+        window = capacity // 2
+        head = self._head()
+        position = self._position
+        messages = []
+        while position < head and (limit is None or len(messages) < limit):
+            if head - position > window:
+                # resume at the oldest message the writer cannot be overwriting
+                oldest = _HEAD.unpack_from(mm, OLDEST_OFFSET)[0]
+                head = self._head()
+                if not head - window <= oldest <= head:
+                    continue    # writer moved on between the two reads
+                self.lost += oldest - position
+                position = oldest
+                continue
+
+            offset = position % capacity
+            if capacity - offset < _LENGTH.size:
+                position += capacity - offset
+                continue
+            length, = _LENGTH.unpack_from(mm, HEADER_SIZE + offset)
+            if length == _PADDING:
+                position += capacity - offset
+                continue
+
+            start = HEADER_SIZE + offset + _LENGTH.size
+            payload = mm[start:start + length]
+            head = self._head()
+            if head - position > window:
+                continue    # overwritten while copying, handled on next iteration
+            messages.append(payload)
+            position += _LENGTH.size + length
+        self._position = position
+        return messages
+
+    def close(self):
+        ''' Release the ring '''
+        self._mmap.close()
+        os.close(self._fd)
@@ -0,0 +1,103 @@
+import asyncio
+import functools
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff:
+    ''' Jittered exponential backoff delays.
+
+    Delays grow by ``factor`` on every attempt up to ``maximum``, and each delay is randomly
+    shortened by up to ``jitter`` of its value, so workers failing together, such as all
+    connections to an exchange during an outage, do not retry in lockstep.
+
+    :param float base: delay of first attempt.
+    :param float maximum: upper bound of delays. Defaults to ``base``, for fixed delays.
+    :param float factor: growth of delays between two attempts.
+    :param float jitter: fraction of delays subject to randomisation, between 0 and 1.
+    :ivar int attempts: number of delays computed since last reset.
+    '''
+    __slots__ = ('base', 'maximum', 'factor', 'jitter', 'attempts', '_delay')
+
+    def __init__(self, base, maximum=None, *, factor=2, jitter=0.5):
+        if not 0 <= jitter <= 1:
+            raise ValueError('jitter must be between 0 and 1')
+        self.base = base
+        self.maximum = base if maximum is None else maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.reset()
+
+    def reset(self):
+        ''' Start over from base delay '''
+        self.attempts = 0
+        self._delay = self.base
+
+    def next(self):
+        ''' Compute delay before next attempt, in seconds '''
+        delay = min(self._delay, self.maximum)
+        self._delay = delay * self.factor
+        self.attempts += 1
+        return delay * (1 - self.jitter * random.random())
+
+
+def worker(*, restart, restart_on_exception, max_delay=None, jitter=0.5, reset_after=60,
+           report=None):
+    ''' Decorator turning a coroutine method into a long-running worker.
+
+    The decorated coroutine is run again when it returns or raises, until the task
+    running it gets cancelled. Delays before running again follow a :class:`Backoff`,
+    that starts over once a run lasted at least ``reset_after`` seconds.
+
+    :param float restart: delay in seconds before running again after a normal return.
+    :param float restart_on_exception: delay in seconds before running again after an
+                                       exception.
+    :param float max_delay: upper bound of delays, as they grow on consecutive restarts.
+                            `None` for fixed delays.
+    :param float jitter: fraction of delays subject to randomisation, between 0 and 1.
+    :param float reset_after: duration in seconds of a run deemed healthy.
+    :param report: invoked before every restart. Has form
+                   ``report(*args, exc=None, retry=delay)``, where ``args`` are the
+                   arguments of the worker, ``exc`` the exception it raised, if any.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            backoffs = {
+                False: Backoff(restart, max(restart, max_delay or 0), jitter=jitter),
+                True: Backoff(restart_on_exception, max(restart_on_exception, max_delay or 0),
+                              jitter=jitter),
+            }
+            while True:
+                started = time.monotonic()
+                exc = None
+                try:
+                    await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:
+                    exc = error
+
+                if time.monotonic() - started >= reset_after:
+                    for backoff in backoffs.values():
+                        backoff.reset()
+                delay = backoffs[exc is not None].next()
+                if exc is not None:
+                    logger.error('worker %s failed, restarting in %.3gs',
+                                 func.__qualname__, delay, exc_info=exc)
+                else:
+                    logger.info('worker %s exited, restarting in %.3gs',
+                                func.__qualname__, delay)
+                if report is not None:
+                    try:
+                        report(*args, exc=exc, retry=delay)
+                    except Exception:
+                        logger.exception('worker %s failed to report restart',
+                                         func.__qualname__)
+                del exc
+                await asyncio.sleep(delay)
+        return wrapper
+    return decorator
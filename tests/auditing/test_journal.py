@@ -0,0 +1,153 @@
+import os
+import re
+import pytest
+from decimal import Decimal
+from cryptomate.auditing import EventType, Journal, read_journal
+from cryptomate.auditing.reader import main
+from cryptomate.market.feed import FeedEvent
+from cryptomate.trading.account import Account, Order
+from cryptomate.trading.data import Trade
+
+TRADE = Trade(id='t42', timestamp=1546300800, symbol='btcusdt', side='buy',
+              amount=Decimal('0.5'), price=Decimal('3700.10'), fee=Decimal('1.85'))
+
+# ----------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_journal_roundtrip(tmp_path):
+    ''' Recorded events are decoded back with their fields '''
+    journal = Journal(directory=str(tmp_path), slots=16)
+    assert re.fullmatch(r'audit-\d{8}T\d{6}-%d\.ring' % os.getpid(),
+                        os.path.basename(journal.path))
+
+    journal.trade(TRADE)
+    journal.order_ack('btcusdt', 1234, 'accepted')
+    journal.subscription_change('binance', 'btcusdt', FeedEvent.TICK, enabled=True)
+    journal.feed_reconnect('binance', None)
+    journal.close()
+    await journal.wait_closed()
+
+    records = list(read_journal(journal.path))
+    assert [record.seq for record in records] == [0, 1, 2, 3]
+    assert [record.type for record in records] == [
+        EventType.TRADE, EventType.ORDER_ACK, EventType.SUBSCRIPTION, EventType.FEED_RECONNECT,
+    ]
+    assert records[0].fields == {
+        'id': 't42', 'timestamp': '1546300800', 'symbol': 'btcusdt', 'side': 'buy',
+        'amount': '0.5', 'price': '3700.10', 'fee': '1.85',
+    }
+    assert records[2].fields['action'] == 'enable'
+    assert records[3].fields == {'feed': 'binance', 'symbol': None, 'reason': None}
+    assert not any(record.truncated for record in records)
+
+
+@pytest.mark.asyncio
+async def test_journal_ring(tmp_path):
+    ''' Oldest records are overwritten once the ring is full '''
+    journal = Journal(str(tmp_path / 'audit.ring'), slots=4)
+    for idx in range(10):
+        journal.order_ack('btcusdt', idx, 'accepted')
+    journal.close()
+    await journal.wait_closed()
+
+    records = list(read_journal(journal.path))
+    assert [record.fields['order_id'] for record in records] == ['6', '7', '8', '9']
+
+
+@pytest.mark.asyncio
+async def test_journal_existing(tmp_path):
+    ''' Existing journals are never overwritten '''
+    journal = Journal(str(tmp_path / 'audit.ring'), slots=4)
+    journal.order_ack('btcusdt', 1, 'accepted')
+    journal.close()
+    await journal.wait_closed()
+
+    with pytest.raises(FileExistsError):
+        Journal(journal.path, slots=4)
+    record, = read_journal(journal.path)
+    assert record.fields['order_id'] == '1'
+
+
+@pytest.mark.asyncio
+async def test_journal_truncation(tmp_path):
+    ''' Records too large for a slot are truncated and flagged '''
+    journal = Journal(str(tmp_path / 'audit.ring'), slots=4, slot_size=32)
+    journal.feed_reconnect('binance', 'btcusdt', 'connection reset by peer')
+    journal.close()
+    await journal.wait_closed()
+
+    record, = read_journal(journal.path)
+    assert record.truncated
+    assert record.fields['feed'] == 'binance'
+
+
+@pytest.mark.asyncio
+async def test_journal_filters(tmp_path, capsys):
+    ''' Reader filters records on type, time and field values '''
+    journal = Journal(str(tmp_path / 'audit.ring'), slots=16)
+    journal.trade(TRADE)
+    journal.trade(TRADE._replace(id='t43', symbol='ethusdt'))
+    journal.order_ack('ethusdt', 1, 'rejected')
+    journal.start(interval=0.01)
+    journal.close()
+    await journal.wait_closed()
+
+    assert [record.fields['id'] for record in
+            read_journal(journal.path, types={EventType.TRADE}, symbol='ethusdt')] == ['t43']
+    assert list(read_journal(journal.path, since=2 ** 40)) == []
+
+    assert main([journal.path, '--type', 'order_ack']) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert len(output) == 1
+    assert 'status=rejected' in output[0]
+
+
+def test_journal_invalid(tmp_path):
+    ''' Reader refuses files that are not journals '''
+    path = tmp_path / 'notajournal'
+    path.write_bytes(b'\0' * 128)
+    with pytest.raises(ValueError):
+        list(read_journal(str(path)))
+
+
+@pytest.mark.asyncio
+async def test_journal_account(tmp_path):
+    ''' Accounts journal orders sent, their acknowledgement and trades '''
+    class DummyAccount(Account):
+        def close(self):
+            pass
+
+        async def add_order(self, order, options=None):
+            if order.amount <= 0:
+                raise ValueError('invalid amount')
+            self.add_trade(TRADE)
+            return 1234
+
+        async def cancel_order(self, order_id):
+            pass
+
+        def get_rules(self, symbol):
+            pass
+
+    order = Order()
+    order.symbol, order.side, order.type = 'btcusdt', 'buy', 'limit'
+    order.amount, order.price, order.leverage = Decimal('0.5'), Decimal('3700.10'), None
+
+    account = DummyAccount()
+    account.journal = Journal(str(tmp_path / 'audit.ring'), slots=16)
+    assert await account.add_order(order) == 1234
+    order.amount = Decimal(0)
+    with pytest.raises(ValueError):
+        await account.add_order(order)
+    account.journal.close()
+    await account.journal.wait_closed()
+
+    records = list(read_journal(account.journal.path))
+    assert [record.type for record in records] == [
+        EventType.ORDER_SENT, EventType.TRADE, EventType.ORDER_ACK,
+        EventType.ORDER_SENT, EventType.ORDER_ACK,
+    ]
+    assert records[0].fields == {'symbol': 'btcusdt', 'side': 'buy', 'type': 'limit',
+                                 'amount': '0.5', 'price': '3700.10', 'leverage': None}
+    assert records[2].fields == {'symbol': 'btcusdt', 'order_id': '1234', 'status': 'accepted'}
+    assert records[4].fields == {'symbol': 'btcusdt', 'order_id': None, 'status': 'rejected'}
@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from cryptomate.benchmark import MarketGenerator
+from cryptomate.benchmark.replay import ReplayServer
+from cryptomate.market.feed import FeedEvent
+from cryptomate.market.feed.binance import BinanceFeed
+
+
+class Collector:
+    ''' Feed callback that records ticks and signals when enough were received '''
+    def __init__(self, expected):
+        self.ticks = []
+        self.expected = expected
+        self.done = asyncio.Event()
+
+    def __call__(self, feed, symbol, event, data):
+        assert (symbol, event) == ('btcusdt', FeedEvent.TICK)
+        self.ticks.append(data)
+        if len(self.ticks) >= self.expected:
+            self.done.set()
+
+
+def no_op(*args, **kwargs):
+    pass
+
+# ----------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_replay_feed():
+    ''' Binance feed receives replayed messages of enabled streams only '''
+    messages = (MarketGenerator(seed=1).binance_messages(500) +
+                MarketGenerator(seed=2).binance_messages(200, symbol='ethusdt'))
+    server = ReplayServer(messages, batch=64)
+    await server.start()
+
+    collector = Collector(500)
+    feed = BinanceFeed(callback=collector, on_error=no_op, ws_url=server.url)
+    try:
+        await feed.enable('btcusdt', FeedEvent.TICK)
+        await asyncio.wait_for(collector.done.wait(), 5)
+        await asyncio.sleep(0.05)
+    finally:
+        feed.close()
+        await feed.wait_closed()
+        await server.close()
+
+    assert [tick.id for tick in collector.ticks] == list(range(1, 501))
+    assert server.connections == 1
+    assert server.sent == 500
+
+
+@pytest.mark.asyncio
+async def test_replay_disconnect():
+    ''' Feed worker reconnects after the server drops the connection '''
+    server = ReplayServer(MarketGenerator().binance_messages(100), disconnect_after=60,
+                          continuous=True)
+    await server.start()
+
+    errors = []
+    collector = Collector(100)
+    feed = BinanceFeed(callback=collector, on_error=lambda *args, **kwargs: errors.append(kwargs),
+                       ws_url=server.url)
+    try:
+        await feed.enable('btcusdt', FeedEvent.TICK)
+        await asyncio.wait_for(collector.done.wait(), 5)
+    finally:
+        feed.close()
+        await feed.wait_closed()
+        await server.close()
+
+    assert server.connections >= 2
+    assert [tick.id for tick in collector.ticks] == list(range(1, 101))
+    assert errors[0]['msg'] == 'connection closed' and 0 < errors[0]['retry'] <= 1
+
+
+@pytest.mark.asyncio
+async def test_replay_pause_rate():
+    ''' Replay can be paused and is throttled to configured rate '''
+    server = ReplayServer(MarketGenerator().binance_messages(100), rate=2000, batch=10)
+    await server.start()
+
+    collector = Collector(100)
+    feed = BinanceFeed(callback=collector, on_error=no_op, ws_url=server.url)
+    try:
+        server.pause()
+        await feed.enable('btcusdt', FeedEvent.TICK)
+        await asyncio.sleep(0.05)
+        assert collector.ticks == []
+
+        start = asyncio.get_event_loop().time()
+        server.resume()
+        await asyncio.wait_for(collector.done.wait(), 5)
+        assert asyncio.get_event_loop().time() - start >= 0.04
+    finally:
+        feed.close()
+        await feed.wait_closed()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_replay_slow_consumer():
+    ''' Consumers that stop reading are disconnected once max_buffer is exceeded '''
+    messages = MarketGenerator(seed=1).binance_messages(1000)
+    server = ReplayServer(messages, repeat=True, max_buffer=256 * 1024)
+    await server.start()
+
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    try:
+        writer.write(b'GET /stream?streams=btcusdt@trade HTTP/1.1\r\n'
+                     b'Host: localhost\r\n'
+                     b'Upgrade: websocket\r\n'
+                     b'Connection: Upgrade\r\n'
+                     b'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n'
+                     b'Sec-WebSocket-Version: 13\r\n\r\n')
+        await writer.drain()
+        for _ in range(500):        # never read past the handshake
+            if server.slow_disconnects:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        writer.close()
+        await server.close()
+
+    assert server.slow_disconnects == 1
+    assert server.sent > 256 * 1024 // max(len(message) for message in messages)
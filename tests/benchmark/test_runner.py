@@ -0,0 +1,91 @@
+import json
+from cryptomate.benchmark import MarketGenerator, SyntheticFeed, run, to_json
+from cryptomate.benchmark.runner import BENCHMARKS, format_results, main, register
+from cryptomate.market import FeedDescription
+from cryptomate.market.feed import FeedEvent, default_factory
+from cryptomate.market.orderbook import OrderBook
+import pytest
+
+# ----------------------------------------------------------------------------
+
+def test_generator_deterministic():
+    ''' Equal seeds generate equal streams '''
+    assert MarketGenerator(seed=1).ticks(50) == MarketGenerator(seed=1).ticks(50)
+    assert MarketGenerator(seed=1).ticks(50) != MarketGenerator(seed=2).ticks(50)
+
+    ticks = MarketGenerator().ticks(100)
+    assert [tick.id for tick in ticks] == list(range(1, 101))
+    assert all(a.timestamp <= b.timestamp for a, b in zip(ticks, ticks[1:]))
+
+    message = json.loads(MarketGenerator().binance_messages(1)[0])
+    assert message['stream'] == 'btcusdt@trade'
+    assert set(message['data']) >= {'E', 't', 'p', 'q', 'm'}
+
+
+def test_generator_orderbook():
+    ''' Order updates stay within requested depth '''
+    generator = MarketGenerator()
+    book = OrderBook()
+    book.update(generator.snapshot(10))
+    assert len(book.buy) == len(book.sell) == 10
+    assert book.best_bid < book.best_ask
+
+    book.update(generator.order_updates(1000, depth=10))
+    assert 0 < len(book.buy) <= 10
+
+
+@pytest.mark.asyncio
+async def test_synthetic_feed():
+    ''' Synthetic feed emits events on enabled streams only '''
+    events = []
+    feed = default_factory.create(FeedDescription('synthetic', 'btcusdt', None),
+                                  callback=lambda *args: events.append(args), on_error=print)
+    assert isinstance(feed, SyntheticFeed)
+
+    await feed.enable('btcusdt', FeedEvent.TICK)
+    await feed.enable('btcusdt', FeedEvent.ORDERBOOK)
+    feed.generate('btcusdt', FeedEvent.TICK, 3)
+    feed.generate('btcusdt', FeedEvent.ORDERBOOK, 5)
+    assert [event[2] for event in events] == [FeedEvent.TICK] * 3 + [FeedEvent.ORDERBOOK]
+    assert len(events[-1][3]) == 5
+
+    await feed.disable('btcusdt', FeedEvent.TICK)
+    with pytest.raises(ValueError):
+        feed.generate('btcusdt', FeedEvent.TICK, 1)
+    feed.close()
+    await feed.wait_closed()
+
+
+def test_run_suite(tmp_path):
+    ''' Benchmarks run and produce machine-readable results '''
+    results = run(['market.'], repeat=2, scale=0.001)
+    assert {result.name for result in results} == {'market.aggregator.update',
+                                                   'market.consolidated.refresh',
+                                                   'market.consolidated.route',
+                                                   'market.engine.dispatch',
+                                                   'market.orderbook.update'}
+    assert all(result.skipped is None and result.best > 0 for result in results)
+    assert len(format_results(results).splitlines()) == len(results) + 1
+
+    document = json.loads(json.dumps(to_json(results)))
+    assert document['version']
+    assert all(item['rate'] > 0 for item in document['results'])
+
+    output = tmp_path / 'results.json'
+    assert main(['market.orderbook', '-r', '1', '-s', '0.001', '-o', str(output)]) == 0
+    assert len(json.loads(output.read_text())['results']) == 3
+
+
+def test_run_teardown():
+    ''' Resources given by setup are released once all runs are over '''
+    calls = []
+
+    @register('test.teardown')
+    def setup(scale):
+        return (lambda: calls.append('run')), 1, 0, lambda: calls.append('teardown')
+    try:
+        result, = run(['test.teardown'], repeat=3)
+    finally:
+        BENCHMARKS.pop()
+    assert result.operations == 1
+    assert calls == ['run'] * 3 + ['teardown']
@@ -0,0 +1,82 @@
+import pytest
+from decimal import Decimal
+from cryptomate.benchmark import MarketGenerator
+from cryptomate.history import FileHistory
+from cryptomate.market import Candle, FeedDescription
+from cryptomate.market.orderbook import OrderBook
+
+DESCRIPTION = FeedDescription('synthetic', 'btcusdt', None)
+
+# ----------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_file_ticks_candles(tmp_path):
+    ''' Ticks and candles are read back within requested range '''
+    history = FileHistory(str(tmp_path))
+    reader = await history.get_reader(DESCRIPTION)
+    assert not reader.has_ticks and reader.earliest_timestamp is None
+
+    ticks = MarketGenerator().ticks(1000)
+    candles = [Candle(0, Decimal(1), Decimal(2), Decimal(1), Decimal(2), Decimal(5)),
+               Candle(60, None, None, None, None, 0)]
+    writer = await history.get_writer(DESCRIPTION)
+    writer.write_ticks(ticks[:500])
+    await writer.flush()
+    writer.write_ticks(ticks[500:])
+    writer.write_candles(candles)
+    await writer.flush()
+    assert writer.newest_timestamp == ticks[-1].timestamp
+
+    reader = await history.get_reader(DESCRIPTION)
+    assert reader.has_ticks and reader.has_candles and not reader.has_order_updates
+    assert reader.earliest_timestamp == 0
+    assert reader.newest_timestamp == ticks[-1].timestamp
+    assert await reader.read_ticks(0, 2 ** 63) == ticks
+
+    middle = ticks[500].timestamp
+    assert await reader.read_ticks(middle, middle + 10) == [
+        tick for tick in ticks if middle <= tick.timestamp < middle + 10]
+    assert await reader.read_candles(0, 120) == candles
+
+
+@pytest.mark.asyncio
+async def test_file_order_updates(tmp_path):
+    ''' Order book is rebuilt from latest snapshot and following updates '''
+    history = FileHistory(str(tmp_path), snapshot_interval=10)
+    generator = MarketGenerator()
+    book = OrderBook()
+    writer = await history.get_writer(DESCRIPTION)
+    for _ in range(100):
+        updates = generator.snapshot(5) if not book.buy else generator.order_updates(10, depth=5)
+        book.update(updates)
+        writer.write_order_updates(updates, order_book=book)
+    await writer.flush()
+
+    reader = await history.get_reader(DESCRIPTION)
+    assert reader.has_order_updates
+    stop = writer.newest_timestamp + 1
+    snapshot = await reader.read_order_updates_snapshot(stop)
+    rebuilt = OrderBook()
+    rebuilt.update(snapshot)
+    rebuilt.update(await reader.read_order_updates(snapshot[0].timestamp + 1, stop))
+    assert rebuilt.buy == book.buy
+    assert rebuilt.sell == book.sell
+    assert await reader.read_order_updates_snapshot(0) is None
+
+
+@pytest.mark.asyncio
+async def test_file_deep_snapshot(tmp_path):
+    ''' Timestamp bounds are found for snapshots of realistic depth '''
+    history = FileHistory(str(tmp_path), snapshot_interval=10)
+    updates = MarketGenerator().snapshot(500)
+    book = OrderBook()
+    book.update(updates)
+    writer = await history.get_writer(DESCRIPTION)
+    for timestamp in (100, 200):
+        writer.write_order_updates([update._replace(timestamp=timestamp) for update in updates],
+                                   order_book=book)
+    await writer.flush()
+
+    reader = await history.get_reader(DESCRIPTION)
+    assert (reader.earliest_timestamp, reader.newest_timestamp) == (100, 200)
+    assert len(await reader.read_order_updates_snapshot(201)) == 1000
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from cryptomate.instrumentation import Histogram, Instruments, LoopLagMonitor, timed
+from cryptomate.instrumentation import default_instruments
+from cryptomate.trading.account import Account, Order
+
+# ----------------------------------------------------------------------------
+
+def test_histogram_precision():
+    ''' Percentiles stay within the relative error bound '''
+    histogram = Histogram(precision=7)
+    for value in range(1, 100001):
+        histogram.record(value)
+
+    summary = histogram.summary()
+    assert summary.count == 100000
+    assert summary.min == 1 and summary.max == 100000
+    assert summary.mean == pytest.approx(50000.5)
+    for percent, expected in ((50, 50000), (90, 90000), (99, 99000), (99.9, 99900)):
+        assert expected <= histogram.percentile(percent) <= expected * (1 + 2 ** -6)
+
+
+def test_histogram_small_values():
+    ''' Small values are counted exactly, out of range values are clamped '''
+    histogram = Histogram(precision=4, highest=1000)
+    for value in (-5, 0, 3, 3, 7, 5000):
+        histogram.record(value)
+    assert histogram.min == 0
+    assert histogram.max == 1000
+    assert histogram.percentile(50) == 3
+    assert Histogram().summary().count == 0
+
+
+def test_histogram_merge():
+    ''' Merged histograms count values of both '''
+    first, second = Histogram(), Histogram()
+    first.record(10)
+    second.record(1000)
+    first.merge(second)
+    assert (first.count, first.min, first.max) == (2, 10, 1000)
+
+    with pytest.raises(ValueError):
+        first.merge(Histogram(precision=3))
+
+
+def test_instruments_snapshot():
+    ''' Measures are kept per stage and symbol, and can be merged across symbols '''
+    instruments = Instruments()
+    instruments.record('feed.callback', 'btcusdt', 1000)
+    instruments.record('feed.callback', 'ethusdt', 3000)
+    instruments.record('feed.parse', 'btcusdt', 500)
+
+    snapshot = instruments.snapshot()
+    assert set(snapshot) == {('feed.callback', 'btcusdt'), ('feed.callback', 'ethusdt'),
+                             ('feed.parse', 'btcusdt')}
+    merged = instruments.snapshot(by_symbol=False)
+    assert merged['feed.callback', None].count == 2
+    assert merged['feed.callback', None].max == 3000
+
+    dump = instruments.dump().splitlines()
+    assert len(dump) == 4
+    assert dump[1].split()[:3] == ['feed.callback', 'btcusdt', '1']
+
+    instruments.enabled = False
+    instruments.record('feed.parse', 'btcusdt', 500)
+    assert instruments.histogram('feed.parse', 'btcusdt').count == 1
+    instruments.reset()
+    assert instruments.snapshot() == {}
+
+
+@pytest.mark.asyncio
+async def test_loop_lag():
+    ''' Loop lag monitor records lag periodically '''
+    instruments = Instruments()
+    monitor = LoopLagMonitor(instruments, interval=0.001)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    monitor.close()
+    assert instruments.histogram('loop.lag').count > 0
+
+
+@pytest.mark.asyncio
+async def test_timed_account():
+    ''' Timed coroutines record their duration, accounts are timed automatically '''
+    instruments = Instruments()
+
+    @timed('test.stage', instruments)
+    async def func():
+        await asyncio.sleep(0.001)
+        return 42
+
+    assert await func() == 42
+    assert instruments.histogram('test.stage').min >= 1000000
+
+    class DummyAccount(Account):
+        def close(self):
+            pass
+
+        async def add_order(self, order, options=None):
+            return order
+
+        async def cancel_order(self, order_id):
+            pass
+
+        def get_rules(self, symbol):
+            pass
+
+    count = getattr(default_instruments.histogram('account.add_order'), 'count', 0)
+    assert await DummyAccount().add_order('order') == 'order'
+    assert default_instruments.histogram('account.add_order').count == count + 1
+
+
+@pytest.mark.asyncio
+async def test_timed_account_override():
+    ''' Overrides calling their parent record one measure, per order symbol '''
+    class BaseAccount(Account):
+        def close(self):
+            pass
+
+        async def add_order(self, order, options=None):
+            return order
+
+        async def cancel_order(self, order_id):
+            pass
+
+        def get_rules(self, symbol):
+            pass
+
+    class DerivedAccount(BaseAccount):
+        async def add_order(self, order, options=None):
+            await asyncio.sleep(0.001)
+            return await super().add_order(order, options)
+
+    class LeafAccount(DerivedAccount):
+        add_order = DerivedAccount.add_order
+
+    order = Order()
+    order.symbol = 'test-override'
+    assert await DerivedAccount().add_order(order) is order
+    histogram = default_instruments.histogram('account.add_order', 'test-override')
+    assert histogram.count == 1
+    assert histogram.min >= 1000000
+
+    assert await BaseAccount().add_order(order) is order
+    assert await LeafAccount().add_order(order) is order
+    assert histogram.count == 3
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from decimal import Decimal
+from cryptomate.benchmark import MarketGenerator
+from cryptomate.benchmark.replay import ReplayServer
+from cryptomate.history import FileHistory
+from cryptomate.market import FeedDescription, Tick
+from cryptomate.market.feed import FeedEvent, default_factory
+from cryptomate.market.feed.backfill import HistoryTickSource
+from cryptomate.market.feed.binance import BinanceFeed, BinanceTickSource
+
+
+class Collector:
+    ''' Feed callback that records ticks and signals when enough were received '''
+    def __init__(self, expected):
+        self.ticks = []
+        self.expected = expected
+        self.done = asyncio.Event()
+
+    def __call__(self, feed, symbol, event, data):
+        assert (symbol, event) == ('btcusdt', FeedEvent.TICK)
+        self.ticks.append(data)
+        if len(self.ticks) >= self.expected:
+            self.done.set()
+
+
+def no_op(*args, **kwargs):
+    pass
+
+
+def parse_tick(message):
+    data = json.loads(message)['data']
+    return Tick(data['t'], data['T'] // 1000, 'sell' if data['m'] else 'buy',
+                Decimal(data['q']), Decimal(data['p']))
+
+# ----------------------------------------------------------------------------
+
+def test_binance_process():
+    ''' Trade messages become ticks, timestamped in seconds '''
+    collector = Collector(1)
+    feed = BinanceFeed(callback=collector, on_error=no_op)
+    feed._streams['btcusdt@trade'] = 'btcusdt'
+    message, = MarketGenerator().binance_messages(1)
+    feed._process(json.loads(message), 0)
+
+    data = json.loads(message)['data']
+    assert collector.ticks == [Tick(data['t'], data['T'] // 1000, 'sell' if data['m'] else 'buy',
+                                    Decimal(data['q']), Decimal(data['p']))]
+    assert collector.ticks[0].timestamp == 1546300800
+
+
+@pytest.mark.asyncio
+async def test_binance_tick_source():
+    ''' Missed trades are read from the REST API, timestamped in seconds '''
+    async def historical_trades(request):
+        start, limit = int(request.query['fromId']), int(request.query['limit'])
+        return web.json_response([{
+            'id': idx, 'price': '100.5', 'qty': '0.1', 'time': 1546300800000 + idx * 1500,
+            'isBuyerMaker': bool(idx % 2),
+        } for idx in range(start, min(start + limit, 3 + start))])
+
+    app = web.Application()
+    app.router.add_get('/api/v3/historicalTrades', historical_trades)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    source = BinanceTickSource(rest_url='http://127.0.0.1:%d' % runner.addresses[0][1])
+    try:
+        after = Tick(10, 1546300815, 'buy', Decimal(1), Decimal(100))
+        before = Tick(17, 1546300825, 'buy', Decimal(1), Decimal(100))
+        ticks = await source.read_ticks('btcusdt', after, before)
+    finally:
+        await source.close()
+        await runner.cleanup()
+
+    assert [tick.id for tick in ticks] == list(range(11, 17))
+    assert [tick.timestamp for tick in ticks] == [
+        1546300800 + idx * 3 // 2 for idx in range(11, 17)]
+    assert ticks[0].type == 'sell' and ticks[0].amount == Decimal('0.1')
+
+
+@pytest.mark.asyncio
+async def test_binance_duplicates():
+    ''' Ticks replayed after a reconnection are delivered once '''
+    server = ReplayServer(MarketGenerator().binance_messages(100), disconnect_after=60)
+    await server.start()
+
+    collector = Collector(60)
+    feed = BinanceFeed(callback=collector, on_error=no_op, ws_url=server.url)
+    try:
+        await feed.enable('btcusdt', FeedEvent.TICK)
+        while server.connections < 2 or server.sent < 120:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+    finally:
+        feed.close()
+        await feed.wait_closed()
+        await server.close()
+
+    assert [tick.id for tick in collector.ticks] == list(range(1, 61))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('backfilled', [True, False])
+async def test_binance_gap(tmp_path, backfilled):
+    ''' Ticks missed while disconnected are filled from history before live ticks '''
+    messages = MarketGenerator().binance_messages(100)
+    history = FileHistory(str(tmp_path))
+    writer = await history.get_writer(FeedDescription('binance', 'btcusdt', None))
+    writer.write_ticks([parse_tick(message) for message in messages])
+    await writer.flush()
+
+    server = ReplayServer(messages, disconnect_after=50, continuous=True, skip=10)
+    await server.start()
+    errors = []
+    collector = Collector(100 if backfilled else 90)
+    feed = default_factory.create(
+        FeedDescription('binance', 'btcusdt', None), callback=collector, ws_url=server.url,
+        on_error=lambda *args, **kwargs: errors.append(kwargs.get('msg')),
+        backfill=HistoryTickSource(history, 'binance') if backfilled else None)
+    try:
+        await feed.enable('btcusdt', FeedEvent.TICK)
+        await asyncio.wait_for(collector.done.wait(), 5)
+    finally:
+        feed.close()
+        await feed.wait_closed()
+        await server.close()
+
+    if backfilled:
+        assert [tick.id for tick in collector.ticks] == list(range(1, 101))
+        assert collector.ticks[55] == parse_tick(messages[55])
+        assert errors == ['connection closed']
+    else:
+        assert [tick.id for tick in collector.ticks] == list(range(1, 51)) + list(range(61, 101))
+        assert errors == ['connection closed', 'lost 10 ticks between 50 and 61']
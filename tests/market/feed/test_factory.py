@@ -1,4 +1,5 @@
 from tests.market.feed.dummy import DummyFeed
+from cryptomate.benchmark import SyntheticFeed
 from cryptomate.market import FeedDescription
 from cryptomate.market.feed.factory import Factory
 from pytest import raises
@@ -21,6 +22,18 @@ def test_factory_create():
         factory.create({'name': 'dummy', 'symbol': 'symbol', 'period': 60})
 
 
+def test_factory_options():
+    ''' Additional options are given to the feed class '''
+    factory = Factory(classes={'synthetic': SyntheticFeed})
+    feed = factory.create(FeedDescription('synthetic', 'symbol', None),
+                          callback=no_op, on_error=no_op, seed=5)
+    assert feed._seed == 5
+
+    with raises(TypeError):
+        factory.create(FeedDescription('synthetic', 'symbol', None),
+                       callback=no_op, on_error=no_op, unknown=1)
+
+
 def test_factory_register():
     ''' Class registered with a factory instance becomes creatable '''
     factory = Factory()
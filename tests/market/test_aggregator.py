@@ -0,0 +1,39 @@
+from decimal import Decimal
+from pytest import raises
+from cryptomate.market.aggregator import Aggregator
+from cryptomate.market.data import Candle, Tick
+
+
+def tick(timestamp, price, amount='1'):
+    return Tick(0, timestamp, None, Decimal(amount), Decimal(price))
+
+# ----------------------------------------------------------------------------
+
+def test_aggregator_update():
+    ''' Ticks are aggregated per period, gaps yield empty candles '''
+    aggregator = Aggregator(60)
+    assert len(aggregator) == 0
+
+    finalized = aggregator.update([tick(0, '10'), tick(10, '12'), tick(59, '9', '2')])
+    assert finalized == []
+    assert aggregator[0] == Candle(0, Decimal(10), Decimal(12), Decimal(9), Decimal(9),
+                                   Decimal(4))
+
+    finalized = aggregator.update([tick(185, '11')])
+    assert [candle.timestamp for candle in finalized] == [0, 60, 120]
+    assert finalized[1] == Candle(60, None, None, None, None, 0)
+    assert len(aggregator) == 4
+    assert aggregator[0] == Candle(180, Decimal(11), Decimal(11), Decimal(11), Decimal(11),
+                                   Decimal(1))
+    assert aggregator[1].timestamp == 120
+    assert aggregator[-1].timestamp == 0
+
+    with raises(IndexError):
+        aggregator[4]
+
+
+def test_aggregator_size():
+    ''' Only the configured number of past candles is kept '''
+    aggregator = Aggregator(1, size=2)
+    aggregator.update([tick(timestamp, '1') for timestamp in range(5)])
+    assert [aggregator[idx].timestamp for idx in range(len(aggregator))] == [4, 3, 2]
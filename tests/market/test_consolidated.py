@@ -0,0 +1,141 @@
+import pytest
+from decimal import Decimal
+from tests.market.feed.dummy import DummyFeed
+from cryptomate.benchmark import MarketGenerator, SyntheticFeed
+from cryptomate.market import Engine
+from cryptomate.market.consolidated import ConsolidatedBook, Leg, normalise_symbol
+from cryptomate.market.data import OrderUpdate
+from cryptomate.market.feed import FeedEvent
+from cryptomate.market.feed.factory import Factory
+from cryptomate.market.orderbook import OrderBook
+
+
+def update(type_, price, amount):
+    return OrderUpdate(None, None, type_, Decimal(amount), Decimal(price))
+
+
+def apply(consolidated, name, book, updates):
+    book.update(updates)
+    consolidated.refresh(name, updates)
+
+
+def merged(books, fees):
+    ''' Reference consolidation, recomputed from scratch '''
+    buy, sell = {}, {}
+    for name, book in books.items():
+        for price, amount in book.buy.items():
+            price = price * (1 - fees[name])
+            buy[price] = buy.get(price, 0) + amount
+        for price, amount in book.sell.items():
+            price = price * (1 + fees[name])
+            sell[price] = sell.get(price, 0) + amount
+    return buy, sell
+
+# ----------------------------------------------------------------------------
+
+def test_normalise_symbol():
+    ''' Platform symbols of a same pair normalise to a same symbol '''
+    assert {normalise_symbol(symbol) for symbol in
+            ('btcusdt', 'BTC-USDT', 'XBT/USDT', 'XBTUSDT', 'btc_usdt')} == {'btcusdt'}
+    assert normalise_symbol('ETH-BTC') == 'ethbtc'
+
+
+def test_consolidated_best():
+    ''' Best prices and routes account for fees and span platforms '''
+    consolidated = ConsolidatedBook('BTC/USDT')
+    first, second = OrderBook(), OrderBook()
+    consolidated.add_venue('first', first, symbol='btcusdt', fee=Decimal('0.01'))
+    consolidated.add_venue('second', second, symbol='XBTUSDT')
+    with pytest.raises(ValueError):
+        consolidated.add_venue('third', OrderBook(), symbol='ethusdt')
+
+    apply(consolidated, 'first', first, [update('buy', 100, 1), update('sell', 100, 2)])
+    apply(consolidated, 'second', second, [update('buy', 100, 1), update('sell', 101, 3)])
+    assert consolidated.best_bid == Decimal(100)
+    assert consolidated.best_ask == Decimal(101)
+    assert list(consolidated.asks()) == [(Decimal(101), Decimal(5))]
+
+    route = consolidated.route('buy', Decimal(4))
+    assert route.amount == Decimal(4)
+    assert route.price == Decimal(101)
+    assert route.legs == (Leg('first', Decimal(2), Decimal(100)),
+                          Leg('second', Decimal(2), Decimal(101)))
+
+    apply(consolidated, 'second', second, [update('sell', 101, 0), update('sell', 102, 1)])
+    route = consolidated.route('buy', Decimal(10))
+    assert route.amount == Decimal(3)
+    assert route.price == (Decimal(202) + Decimal(102)) / 3
+    assert consolidated.route('sell', Decimal(1)).legs == (Leg('second', Decimal(1),
+                                                               Decimal(100)),)
+
+    consolidated.remove_venue('second')
+    assert list(consolidated.bids()) == [(Decimal(99), Decimal(1))]
+    assert consolidated.route('buy', Decimal(1)).legs == (Leg('first', Decimal(1),
+                                                              Decimal(100)),)
+
+
+def test_consolidated_incremental():
+    ''' Incremental merging matches a complete merge, snapshots included '''
+    fees = {'first': Decimal('0.001'), 'second': Decimal('0.002')}
+    books = {name: OrderBook() for name in fees}
+    consolidated = ConsolidatedBook('btcusdt')
+    for name, book in books.items():
+        consolidated.add_venue(name, book, fee=fees[name])
+
+    generators = {name: MarketGenerator(seed=name) for name in books}
+    for name, generator in generators.items():
+        apply(consolidated, name, books[name], generator.snapshot(20))
+    for step in range(50):
+        for name, generator in generators.items():
+            apply(consolidated, name, books[name], generator.order_updates(20, depth=20))
+        if step == 25:
+            books['first'].clear()
+            apply(consolidated, 'first', books['first'], generators['first'].snapshot(5))
+
+    buy, sell = merged(books, fees)
+    assert consolidated.buy == buy
+    assert consolidated.sell == sell
+    assert [price for price, _ in consolidated.bids()] == sorted(buy, reverse=True)
+    assert [price for price, _ in consolidated.asks()] == sorted(sell)
+
+
+@pytest.mark.asyncio
+async def test_consolidated_subscribe():
+    ''' Platform order books are merged as engine updates arrive '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    changes = []
+    consolidated = ConsolidatedBook('btcusdt', callback=lambda book, name: changes.append(name))
+    subscription = await consolidated.subscribe(engine, 'dummy', 'BTC-USDT')
+    engine._feeds['dummy'].generate_event('BTC-USDT', FeedEvent.ORDERBOOK,
+                                          data=[update('buy', 99, 1)])
+    assert changes == ['dummy']
+    assert consolidated.best_bid == Decimal(99)
+
+    subscription.close()
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_consolidated_subscribe_streaming(caplog):
+    ''' Updates arriving while subscribing are merged once the venue is added '''
+    class EagerFeed(SyntheticFeed):
+        async def enable(self, symbol, event):
+            await super().enable(symbol, event)
+            self.generate(symbol, event, 50)
+
+    engine = Engine(factory=Factory(classes={'synthetic': EagerFeed}))
+    consolidated = ConsolidatedBook('btcusdt')
+    subscription = await consolidated.subscribe(engine, 'synthetic', 'btcusdt')
+    book = subscription.order_book
+    assert book.buy and consolidated.buy == merged({'synthetic': book}, {'synthetic': 0})[0]
+
+    engine._feeds['synthetic'].generate('btcusdt', FeedEvent.ORDERBOOK, 50)
+    buy, sell = merged({'synthetic': book}, {'synthetic': 0})
+    assert consolidated.buy == buy
+    assert consolidated.sell == sell
+    assert not [record for record in caplog.records if record.levelname == 'ERROR']
+
+    subscription.close()
+    engine.close()
+    await engine.wait_closed()
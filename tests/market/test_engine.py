@@ -0,0 +1,227 @@
+import asyncio
+import pytest
+from decimal import Decimal
+from tests.market.feed.dummy import DummyFeed
+from cryptomate.auditing import EventType, Journal, read_journal
+from cryptomate.benchmark import SyntheticFeed
+from cryptomate.market import Engine, FeedDescription, OverflowPolicy, Tick
+from cryptomate.market.data import OrderUpdate
+from cryptomate.market.feed import FeedEvent
+from cryptomate.market.feed.factory import Factory
+
+
+def tick(idx, price='100'):
+    return Tick(idx, 60 * idx, 'buy', Decimal(1), Decimal(price))
+
+# ----------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_engine_ticks():
+    ''' Streams are enabled while subscribed, ticks reach all subscribers '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    received = []
+    first = await engine.subscribe_ticks(FeedDescription('dummy', 'btcusdt', None),
+                                         lambda *args: received.append(('first',) + args))
+    second = await engine.subscribe_ticks(FeedDescription('dummy', 'btcusdt', 60),
+                                          lambda *args: received.append(('second',) + args))
+    feed = engine._feeds['dummy']
+    assert feed.enabled == (('btcusdt', FeedEvent.TICK),)
+    assert first.data is None
+    assert second.data.period == 60
+
+    feed.generate_event('btcusdt', FeedEvent.TICK, data=tick(1))
+    assert [item[0] for item in received] == ['first', 'second']
+    assert received[0][1:] == (first.description, tick(1))
+    assert len(second.data) == 1
+
+    first.close()
+    with second:
+        pass
+    await asyncio.sleep(0)
+    assert feed.enabled == ()
+
+    engine.close()
+    await engine.wait_closed()
+    assert feed.closed
+
+
+@pytest.mark.asyncio
+async def test_engine_orderbook():
+    ''' Order book is updated before subscribers are invoked '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    seen = []
+    subscription = await engine.subscribe_orderbook(
+        FeedDescription('dummy', 'btcusdt', None),
+        lambda description, updates: seen.append(subscription.order_book.best_bid))
+    feed = engine._feeds['dummy']
+    feed.generate_event('btcusdt', FeedEvent.ORDERBOOK,
+                        data=[OrderUpdate(1, 0, 'buy', Decimal(1), Decimal(99))])
+    assert seen == [Decimal(99)]
+
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_engine_failed_enable():
+    ''' Failing to enable a stream fails the subscription '''
+    engine = Engine(factory=Factory())
+    with pytest.raises(ValueError):
+        await engine.subscribe_ticks(FeedDescription('dummy', 'btcusdt', None), print)
+    assert engine._subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_engine_queued_ticks():
+    ''' A slow queued subscriber lags and drops oldest ticks, without delaying others '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    description = FeedDescription('dummy', 'btcusdt', None)
+    release = asyncio.Event()
+    fast, slow = [], []
+
+    async def slow_callback(description, tick):
+        await release.wait()
+        slow.append(tick)
+
+    slow_subscription = await engine.subscribe_ticks(description, slow_callback, queue_size=2)
+    fast_subscription = await engine.subscribe_ticks(description,
+                                                     lambda *args: fast.append(args[1]))
+    feed = engine._feeds['dummy']
+    feed.generate_event('btcusdt', FeedEvent.TICK, data=tick(1))
+    await asyncio.sleep(0)          # slow subscriber now waits on first tick
+    for idx in range(2, 7):
+        feed.generate_event('btcusdt', FeedEvent.TICK, data=tick(idx))
+    assert fast == [tick(idx) for idx in range(1, 7)]
+    assert (slow_subscription.lag, slow_subscription.dropped) == (2, 3)
+    assert (fast_subscription.lag, fast_subscription.dropped) == (0, 0)
+
+    release.set()
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert slow == [tick(1), tick(5), tick(6)]
+    assert slow_subscription.lag == 0 and slow_subscription.max_lag == 2
+
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_engine_queued_overflow():
+    ''' Order book updates are conflated, or the subscriber disconnected, on overflow '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    description = FeedDescription('dummy', 'btcusdt', None)
+    conflated, disconnected, notified = [], [], []
+    first = await engine.subscribe_orderbook(
+        description, lambda description, updates: conflated.append(updates), queue_size=1)
+    second = await engine.subscribe_orderbook(
+        description, lambda description, updates: disconnected.append(updates),
+        queue_size=1, overflow=OverflowPolicy.DISCONNECT, on_disconnect=notified.append)
+    feed = engine._feeds['dummy']
+    for price, amount in ((99, 1), (98, 2), (99, 3)):
+        feed.generate_event('btcusdt', FeedEvent.ORDERBOOK,
+                            data=[OrderUpdate(1, 0, 'buy', Decimal(amount), Decimal(price))])
+    assert (first.lag, first.dropped) == (1, 2)
+    assert second.dropped == 2
+    assert second.closed and not first.closed
+    assert notified == [second]
+    assert engine._subscriptions[(description.name, description.symbol,
+                                  FeedEvent.ORDERBOOK)] == [first]
+
+    await asyncio.sleep(0)
+    assert conflated == [[OrderUpdate(1, 0, 'buy', Decimal(3), Decimal(99)),
+                          OrderUpdate(1, 0, 'buy', Decimal(2), Decimal(98))]]
+    assert disconnected == []
+    assert first.order_book.buy == {Decimal(99): Decimal(3), Decimal(98): Decimal(2)}
+
+    engine.close()
+    await engine.wait_closed()
+    assert first.closed
+
+
+@pytest.mark.asyncio
+async def test_engine_closed_in_batch():
+    ''' Subscriptions closed while a batch is dispatched receive no further events '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    description = FeedDescription('dummy', 'btcusdt', None)
+    key = (description.name, description.symbol, FeedEvent.TICK)
+    queued, inline, notified = [], [], []
+
+    async def queued_callback(description, tick):
+        queued.append(tick)
+
+    def inline_callback(description, tick):
+        inline.append(tick)
+        subscription.close()
+
+    disconnected = await engine.subscribe_ticks(
+        description, queued_callback, queue_size=2, overflow=OverflowPolicy.DISCONNECT,
+        on_disconnect=notified.append)
+    subscription = await engine.subscribe_ticks(description, inline_callback)
+    engine._dispatch_ticks(key, [tick(idx) for idx in range(1, 7)])
+    await asyncio.sleep(0)
+
+    assert disconnected.closed and notified == [disconnected]
+    assert queued == []
+    assert inline == [tick(1)]
+
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_engine_failing_callback(caplog):
+    ''' Inline callbacks raising do not reach the feed nor other subscribers '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    description = FeedDescription('dummy', 'btcusdt', None)
+    received = []
+
+    def failing_callback(description, tick):
+        raise ValueError('strategy bug')
+
+    await engine.subscribe_ticks(description, failing_callback)
+    await engine.subscribe_ticks(description, lambda description, tick: received.append(tick))
+    engine._feeds['dummy'].generate_event('btcusdt', FeedEvent.TICK, data=tick(1))
+
+    assert received == [tick(1)]
+    assert 'subscriber failed' in caplog.text
+
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_engine_feed_options():
+    ''' Feeds are created with the options configured for their name '''
+    engine = Engine(factory=Factory(classes={'synthetic': SyntheticFeed}),
+                    feed_options={'synthetic': {'seed': 5}})
+    await engine.subscribe_ticks(FeedDescription('synthetic', 'btcusdt', None), print)
+    assert engine._feeds['synthetic']._seed == 5
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_engine_journal(tmp_path):
+    ''' Streams being enabled or disabled and feed reconnections are journaled '''
+    journal = Journal(str(tmp_path / 'audit.ring'), slots=16)
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}), journal=journal)
+    subscription = await engine.subscribe_ticks(FeedDescription('dummy', 'btcusdt', None),
+                                                lambda *args: None)
+    feed = engine._feeds['dummy']
+    feed.generate_error('btcusdt', FeedEvent.TICK, exc=ConnectionError('reset'), retry=2)
+    feed.generate_error('btcusdt', FeedEvent.TICK, msg='lost 3 ticks')
+    subscription.close()
+    await asyncio.sleep(0)
+    engine.close()
+    await engine.wait_closed()
+    journal.close()
+    await journal.wait_closed()
+
+    records = list(read_journal(journal.path))
+    assert [record.type for record in records] == [
+        EventType.SUBSCRIPTION, EventType.FEED_RECONNECT, EventType.SUBSCRIPTION,
+    ]
+    assert records[0].fields == {'feed': 'dummy', 'symbol': 'btcusdt', 'event': 'tick',
+                                 'action': 'enable'}
+    assert records[1].fields == {'feed': 'dummy', 'symbol': 'btcusdt', 'reason': 'reset'}
+    assert records[2].fields['action'] == 'disable'
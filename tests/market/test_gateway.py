@@ -0,0 +1,232 @@
+import asyncio
+import multiprocessing
+import os
+import pytest
+from cryptomate.benchmark import SyntheticFeed
+from cryptomate.market import Engine, FeedDescription
+from cryptomate.market.feed import FeedEvent
+from cryptomate.market.feed.factory import Factory
+from cryptomate.market.gateway import Gateway, RemoteEngine, serve
+from cryptomate.util.ring import RingReader, RingWriter
+
+
+async def wait_for(predicate, timeout=2):
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, 'timed out'
+        await asyncio.sleep(0.001)
+
+
+
+class StreamingFeed(SyntheticFeed):
+    ''' Synthetic feed emitting events continuously once enabled '''
+    async def enable(self, symbol, event):
+        await super().enable(symbol, event)
+        self.start(1000, batch=10)
+
+# ----------------------------------------------------------------------------
+
+def test_ring(tmp_path):
+    ''' Messages are read in order across wraps, slow readers lose data '''
+    path = str(tmp_path / 'ring')
+    writer = RingWriter(path, capacity=256)
+    fast, slow = RingReader(path), RingReader(path)
+
+    received = []
+    for idx in range(100):
+        writer.write(b'message %d' % idx)
+        received.extend(fast.read())
+    assert received == [b'message %d' % idx for idx in range(100)]
+    assert fast.lost == 0
+
+    messages = slow.read()
+    assert slow.lost > 0
+    assert messages == [b'message %d' % idx for idx in range(100 - len(messages), 100)]
+
+    with pytest.raises(ValueError):
+        writer.write(b'x' * 200)
+    slow.close()
+    fast.close()
+    writer.close()
+
+
+def test_ring_overrun(tmp_path):
+    ''' Readers falling behind resume at the oldest message still safe to read '''
+    path = str(tmp_path / 'ring')
+    writer = RingWriter(path, capacity=100)
+    reader = RingReader(path)
+
+    for idx in range(16):       # head ends in the second half of the ring
+        writer.write(b'msg%03d' % idx)
+    assert writer.head == 160
+    assert reader.read() == [b'msg%03d' % idx for idx in range(11, 16)]
+    assert reader.lost == 110
+
+    for idx in range(16, 20):
+        writer.write(b'msg%03d' % idx)
+    assert reader.read() == [b'msg%03d' % idx for idx in range(16, 20)]
+    assert reader.lost == 110
+    reader.close()
+    writer.close()
+
+
+@pytest.mark.asyncio
+async def test_gateway(tmp_path):
+    ''' Remote engine receives events published by the gateway '''
+    engine = Engine(factory=Factory(classes={'synthetic': SyntheticFeed}))
+    gateway = Gateway(str(tmp_path / 'gateway.sock'), engine=engine, directory=str(tmp_path))
+    await gateway.start()
+    remote = RemoteEngine(gateway.address)
+
+    ticks, updates = [], []
+    description = FeedDescription('synthetic', 'btcusdt', None)
+    tick_subscription = await remote.subscribe_ticks(
+        description, lambda description, tick: ticks.append(tick))
+    feed = engine._feeds['synthetic']
+    feed.generate('btcusdt', FeedEvent.TICK, 50)
+    await wait_for(lambda: len(ticks) == 50)
+    assert [tick.id for tick in ticks] == list(range(1, 51))
+
+    # order book subscribers joining late receive a snapshot
+    local_book = await engine.subscribe_orderbook(description, lambda *args: None)
+    feed.generate('btcusdt', FeedEvent.ORDERBOOK, 200)
+    book_subscription = await remote.subscribe_orderbook(
+        description, lambda description, items: updates.append(items))
+    await wait_for(lambda: updates)
+    assert book_subscription.order_book.buy == local_book.order_book.buy
+    assert book_subscription.order_book.sell == local_book.order_book.sell
+
+    feed.generate('btcusdt', FeedEvent.ORDERBOOK, 200)
+    await wait_for(lambda: len(updates) == 2)
+    assert book_subscription.order_book.buy == local_book.order_book.buy
+
+    tick_subscription.close()
+    await wait_for(lambda: ('btcusdt', FeedEvent.TICK) not in feed._enabled)
+    with pytest.raises(ValueError):
+        await remote.subscribe_ticks(FeedDescription('unknown', 'btcusdt', None), print)
+
+    remote.close()
+    await remote.wait_closed()
+    gateway.close()
+    await gateway.wait_closed()
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_gateway_concurrent(tmp_path):
+    ''' Concurrent subscriptions share the stream setup, and its failure '''
+    engine = Engine(factory=Factory(classes={'synthetic': SyntheticFeed}))
+    gateway = Gateway(str(tmp_path / 'gateway.sock'), engine=engine, directory=str(tmp_path))
+    await gateway.start()
+    remotes = [RemoteEngine(gateway.address) for _ in range(2)]
+
+    description = FeedDescription('synthetic', 'btcusdt', None)
+    first, second = await asyncio.gather(*(
+        remote.subscribe_orderbook(description, lambda *args: None) for remote in remotes))
+    key = ('synthetic', 'btcusdt', FeedEvent.ORDERBOOK)
+    assert gateway._streams[key].count == 2
+    first.close()
+    await wait_for(lambda: gateway._streams[key].count == 1)
+    second.close()
+    await wait_for(lambda: key not in gateway._streams)
+
+    unknown = FeedDescription('unknown', 'btcusdt', None)
+    results = await asyncio.gather(*(
+        remote.subscribe_orderbook(unknown, lambda *args: None) for remote in remotes),
+        return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert gateway._streams == {} and gateway._pending == {}
+    assert os.listdir(str(tmp_path)) == ['gateway.sock']
+
+    for remote in remotes:
+        remote.close()
+        await remote.wait_closed()
+    gateway.close()
+    await gateway.wait_closed()
+    engine.close()
+    await engine.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_gateway_failures(tmp_path):
+    ''' Failed dispatches are isolated, order books that lost updates are resynchronised '''
+    engine = Engine(factory=Factory(classes={'synthetic': SyntheticFeed}))
+    gateway = Gateway(str(tmp_path / 'gateway.sock'), engine=engine, directory=str(tmp_path),
+                      capacity=1 << 14)
+    await gateway.start()
+    remote = RemoteEngine(gateway.address)
+
+    ticks = []
+    btc = FeedDescription('synthetic', 'btcusdt', None)
+    eth = FeedDescription('synthetic', 'ethusdt', None)
+    await remote.subscribe_ticks(btc, lambda *args: None)
+    await remote.subscribe_ticks(eth, lambda description, tick: ticks.append(tick))
+    feed = engine._feeds['synthetic']
+    gateway._streams['synthetic', 'btcusdt', FeedEvent.TICK].ring.write(b'not a pickle')
+    feed.generate('ethusdt', FeedEvent.TICK, 10)
+    await wait_for(lambda: len(ticks) == 10)
+    assert not remote._poller.done()
+
+    # updates overwritten before being read, remote book gets a new snapshot
+    local_book = await engine.subscribe_orderbook(btc, lambda *args: None)
+    book_subscription = await remote.subscribe_orderbook(btc, lambda *args: None)
+    key = ('synthetic', 'btcusdt', FeedEvent.ORDERBOOK)
+    reader = remote._readers[key]
+    for _ in range(10):
+        feed.generate('btcusdt', FeedEvent.ORDERBOOK, 100)
+        gateway._streams[key].flush()
+    await wait_for(lambda: remote._readers[key] is not reader and not remote._resyncs)
+    await wait_for(lambda: book_subscription.order_book.buy == local_book.order_book.buy)
+    assert book_subscription.order_book.sell == local_book.order_book.sell
+    await wait_for(lambda: gateway._streams[key].count == 1)
+
+    remote.close()
+    await remote.wait_closed()
+    gateway.close()
+    await gateway.wait_closed()
+    engine.close()
+    await engine.wait_closed()
+
+
+def test_gateway_process(tmp_path):
+    ''' Strategy process receives events from a gateway running in another process '''
+    address = str(tmp_path / 'gateway.sock')
+    context = multiprocessing.get_context('spawn')
+    process = context.Process(target=serve, args=(address,), kwargs={
+        'engine': Engine(factory=Factory(classes={'synthetic': StreamingFeed})),
+        'directory': str(tmp_path),
+    })
+    process.start()
+
+    async def strategy():
+        remote = RemoteEngine(address)
+        ticks = []
+        await wait_for(lambda: os.path.exists(address), timeout=10)
+        while True:     # socket file exists slightly before the gateway listens
+            try:
+                subscription = await remote.subscribe_ticks(
+                    FeedDescription('synthetic', 'btcusdt', None),
+                    lambda description, tick: ticks.append(tick))
+                break
+            except ConnectionRefusedError:
+                await asyncio.sleep(0.01)
+        await wait_for(lambda: len(ticks) >= 50)
+        subscription.close()
+        remote.close()
+        await remote.wait_closed()
+        return ticks
+
+    try:
+        loop = asyncio.new_event_loop()
+        try:
+            ticks = loop.run_until_complete(strategy())
+        finally:
+            loop.close()
+        assert [tick.id for tick in ticks] == list(range(ticks[0].id, ticks[0].id + len(ticks)))
+    finally:
+        process.terminate()
+        process.join(10)
+    assert process.exitcode == 0
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.ring')]
@@ -0,0 +1,27 @@
+from decimal import Decimal
+from cryptomate.market.data import OrderUpdate
+from cryptomate.market.orderbook import OrderBook
+
+
+def update(type, price, amount):
+    return OrderUpdate(0, 0, type, Decimal(amount), Decimal(price))
+
+# ----------------------------------------------------------------------------
+
+def test_orderbook_update():
+    ''' Updates set, replace and remove price levels '''
+    book = OrderBook()
+    assert book.best_bid is None and book.best_ask is None
+
+    book.update([update('buy', '99', '1'), update('buy', '98', '2'), update('buy', '100', '3'),
+                 update('sell', '102', '1'), update('sell', '101', '4')])
+    assert book.best_bid == Decimal('100')
+    assert book.best_ask == Decimal('101')
+    assert list(book.bids()) == [(Decimal(100), Decimal(3)), (Decimal(99), Decimal(1)),
+                                 (Decimal(98), Decimal(2))]
+    assert list(book.asks()) == [(Decimal(101), Decimal(4)), (Decimal(102), Decimal(1))]
+
+    book.update([update('buy', '100', '0'), update('sell', '101', '5'),
+                 update('sell', '105', '0')])
+    assert book.best_bid == Decimal('99')
+    assert book.sell == {Decimal(101): Decimal(5), Decimal(102): Decimal(1)}
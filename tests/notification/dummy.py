@@ -0,0 +1,27 @@
+import asyncio
+from cryptomate.notification import Destination
+
+
+class DummyDestination(Destination):
+    ''' Destination that records batches in memory
+        and allows emulating slow or failing endpoints
+    '''
+    __slots__ = ('batches', 'delay', 'fail')
+
+    def __init__(self, *, delay=0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def send(self, notifications):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError('emulated delivery failure')
+        self.batches.append(list(notifications))
+
+    # Debugging tools
+
+    @property
+    def notifications(self):
+        return [notification for batch in self.batches for notification in batch]
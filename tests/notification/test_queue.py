@@ -0,0 +1,138 @@
+import asyncio
+import json
+import pytest
+from tests.notification.dummy import DummyDestination
+from cryptomate.notification import Overflow, QueuedNotifier
+from cryptomate.notification.file import FileDestination
+
+# ----------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_queued_batching():
+    ''' Posts made within the same loop iteration are delivered as a single batch '''
+    destination = DummyDestination()
+    notifier = QueuedNotifier([destination], interval=0)
+    for idx in range(5):
+        notifier.post(message='event', idx=idx)
+    assert destination.batches == []        # posting does not deliver inline
+
+    notifier.close()
+    await notifier.wait_closed()
+    assert len(destination.batches) == 1
+    assert [item.data['idx'] for item in destination.notifications] == list(range(5))
+
+
+@pytest.mark.asyncio
+async def test_queued_batch_size():
+    ''' Batches never exceed configured size '''
+    destination = DummyDestination()
+    notifier = QueuedNotifier([destination], batch_size=2, interval=0)
+    for idx in range(5):
+        notifier.post(idx=idx)
+    notifier.close()
+    await notifier.wait_closed()
+    assert [len(batch) for batch in destination.batches] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_queued_deduplication():
+    ''' Identical notifications are collapsed and counted '''
+    destination = DummyDestination()
+    notifier = QueuedNotifier([destination], interval=0, window=60)
+    for _ in range(3):
+        notifier.post(message='crash', symbol='btcusdt')
+    notifier.post(message='crash', symbol='ethusdt')
+    await asyncio.sleep(0)
+
+    assert [item.data['symbol'] for item in destination.notifications] == ['btcusdt', 'ethusdt']
+
+    notifier.close()
+    await notifier.wait_closed()
+    last = destination.notifications[-1]
+    assert last.data == {'message': 'crash', 'symbol': 'btcusdt'}
+    assert last.suppressed == 2
+
+
+@pytest.mark.asyncio
+async def test_queued_deduplication_expiry():
+    ''' Suppressed duplicates are reported once the window expires, without further posts '''
+    destination = DummyDestination()
+    notifier = QueuedNotifier([destination], interval=0, window=0.05)
+    for _ in range(3):
+        notifier.post(message='crash')
+    await asyncio.sleep(0.1)
+
+    assert [item.suppressed for item in destination.notifications] == [0, 2]
+    notifier.close()
+    await notifier.wait_closed()
+    assert len(destination.notifications) == 2
+
+
+@pytest.mark.asyncio
+async def test_queued_deduplication_unhashable():
+    ''' Notifications with unhashable arguments are deduplicated too '''
+    destination = DummyDestination()
+    notifier = QueuedNotifier([destination], interval=0)
+    notifier.post(symbols=['btcusdt'])
+    notifier.post(symbols=['btcusdt'])
+    notifier.close()
+    await notifier.wait_closed()
+    assert [item.suppressed for item in destination.notifications] == [0, 1]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('overflow', [Overflow.DROP, Overflow.SUMMARISE])
+async def test_queued_overflow(overflow):
+    ''' Notifications that do not fit are dropped, optionally with a summary '''
+    destination = DummyDestination()
+    notifier = QueuedNotifier([destination], queue_size=2, interval=0, overflow=overflow)
+    for idx in range(5):
+        notifier.post(idx=idx)
+    notifier.close()
+    await notifier.wait_closed()
+
+    data = [item.data for item in destination.notifications]
+    if overflow is Overflow.SUMMARISE:
+        assert data == [{'idx': 0}, {'idx': 1}, {'dropped': 3}]
+    else:
+        assert data == [{'idx': 0}, {'idx': 1}]
+    assert notifier.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_queued_destination_isolation():
+    ''' A slow or failing destination does not hold back the others '''
+    slow, failing, fast = (DummyDestination(delay=10), DummyDestination(fail=True),
+                           DummyDestination())
+    notifier = QueuedNotifier([slow, failing, fast], interval=0)
+    notifier.post(message='first')
+    notifier.post(message='second')
+    await asyncio.sleep(0.01)
+
+    assert len(fast.notifications) == 2
+    assert slow.notifications == []
+    assert failing.notifications == []
+
+    notifier.close()
+    with pytest.raises(RuntimeError):
+        notifier.post(message='late')
+
+    tasks = [channel.task for channel in notifier._channels]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_file_destination(tmp_path):
+    ''' File destination appends one JSON object per notification '''
+    path = str(tmp_path / 'notifications.log')
+    notifier = QueuedNotifier([FileDestination(path)], interval=0)
+    notifier.post(message='first')
+    notifier.post(message='second')
+    notifier.close()
+    await notifier.wait_closed()
+
+    with open(path) as fd:
+        lines = [json.loads(line) for line in fd]
+    assert [line['data']['message'] for line in lines] == ['first', 'second']
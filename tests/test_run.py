@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from decimal import Decimal
+from tests.market.feed.dummy import DummyFeed
+from cryptomate import run
+from cryptomate.history import FileHistory
+from cryptomate.market import Engine, FeedDescription, Tick
+from cryptomate.market.feed import FeedEvent
+from cryptomate.market.feed.factory import Factory
+
+seen = []
+
+
+def strategy(description, aggregator):
+    ''' Test strategy, recording ticks and aggregator length '''
+    return lambda description, tick: seen.append((tick, len(aggregator)))
+
+# ----------------------------------------------------------------------------
+
+def test_run_arguments(capsys):
+    ''' Benchmark options are passed through, others are checked '''
+    assert run.main(['bench', '--list', 'market']) == 0
+    assert 'market.aggregator' in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        run.parse_arguments(['record', 'history', 'btcusdt', '--list'])
+    assert run.main(['backtest', 'history', 'btcusdt', 'nomodule']) == 2
+    assert run.main(['record', 'history', 'btcusdt', '-f', 'synthetic', '--backfill']) == 2
+
+    options = run.parse_arguments(['record', 'history', 'btcusdt', '-O', 'ws_url=ws://x/',
+                                   '-O', 'max_backfill=5'])
+    assert options.feed_options == [('ws_url', 'ws://x/'), ('max_backfill', 5)]
+    assert options.audit is None
+    assert run.parse_arguments(['record', 'history', 'btcusdt', '--audit', 'logs']).audit == 'logs'
+    with pytest.raises(SystemExit):
+        run.parse_arguments(['record', 'history', 'btcusdt', '-O', 'ws_url'])
+
+
+@pytest.mark.asyncio
+async def test_run_record_backtest(tmp_path, capsys):
+    ''' Recorded ticks are replayed to strategies '''
+    engine = Engine(factory=Factory(classes={'dummy': DummyFeed}))
+    history = FileHistory(str(tmp_path))
+    options = run.parse_arguments(['record', str(tmp_path), 'btcusdt', '-f', 'dummy',
+                                   '-d', '0.01'])
+    ticks = [Tick(idx, 30 * idx, 'buy', Decimal(1), Decimal(100 + idx)) for idx in range(10)]
+
+    task = asyncio.ensure_future(run.record(options, engine, history))
+    while 'dummy' not in engine._feeds:
+        await asyncio.sleep(0)
+    for tick in ticks:
+        engine._feeds['dummy'].generate_event('btcusdt', FeedEvent.TICK, data=tick)
+    assert await task == 0
+
+    reader = await history.get_reader(FeedDescription('dummy', 'btcusdt', None))
+    assert await reader.read_ticks(0, 2 ** 63) == ticks
+
+    options = run.parse_arguments(['replay', str(tmp_path), 'btcusdt',
+                                   'tests.test_run:strategy', '-f', 'dummy', '-p', '60',
+                                   '--stop', '150'])
+    assert await run.backtest(options, history, strategy) == 0
+    assert [tick for tick, _ in seen] == ticks[:5]
+    assert [length for _, length in seen] == [1, 1, 2, 2, 3]
+    assert '5 ticks' in capsys.readouterr().out
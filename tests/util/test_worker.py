@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from cryptomate.util.worker import Backoff, worker
+
+
+class Flaky:
+    ''' Worker failing a number of times, then running until cancelled '''
+    def __init__(self, failures):
+        self.failures = failures
+        self.reports = []
+        self.running = asyncio.Event()
+
+    def report(self, *, exc=None, retry=None):
+        self.reports.append((exc, retry))
+
+    @worker(restart=0.001, restart_on_exception=0.002, max_delay=0.01, jitter=0,
+            report=report)
+    async def run(self):
+        if self.failures:
+            self.failures -= 1
+            raise ValueError('failure')
+        self.running.set()
+        await asyncio.sleep(3600)
+
+# ----------------------------------------------------------------------------
+
+def test_backoff():
+    ''' Delays grow exponentially up to maximum, randomised within jitter '''
+    backoff = Backoff(1, 10, jitter=0)
+    assert [backoff.next() for _ in range(6)] == [1, 2, 4, 8, 10, 10]
+    assert backoff.attempts == 6
+    backoff.reset()
+    assert backoff.next() == 1
+
+    backoff = Backoff(1, 10, jitter=0.5)
+    delays = [backoff.next() for _ in range(100)]
+    assert all(5 <= delay <= 10 for delay in delays[10:])
+    assert len(set(delays)) == 100
+
+    backoff = Backoff(3, jitter=0)
+    assert [backoff.next() for _ in range(3)] == [3, 3, 3]
+    with pytest.raises(ValueError):
+        Backoff(1, jitter=2)
+
+
+@pytest.mark.asyncio
+async def test_worker_report():
+    ''' Worker is restarted with growing delays, each restart being reported '''
+    flaky = Flaky(5)
+    task = asyncio.ensure_future(flaky.run())
+    await asyncio.wait_for(flaky.running.wait(), 1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert all(isinstance(exc, ValueError) for exc, _ in flaky.reports)
+    assert [retry for _, retry in flaky.reports] == [0.002, 0.004, 0.008, 0.01, 0.01]